@@ -0,0 +1,194 @@
+"""Compact export formats for the PINN animations.
+
+The GIFs written by the Pillow writer use an adaptive palette per frame and
+repaint the full 1600x700 frame each time. This module re-encodes an
+animation as:
+
+* ``gif``: one global palette shared by all frames, so no per-frame colour
+  tables, and ``optimize`` so every frame is cropped to the region that changed
+  since the previous one, with unchanged pixels inside it made transparent.
+* ``webp``: animated WebP through Pillow.
+* ``mp4`` (H.264) and ``webm`` (VP9): only when an ``ffmpeg`` binary is on the PATH.
+
+With ``target_bytes`` set, each format walks down a quality ladder (fewer
+colours / lower quality / higher CRF, then smaller scale) until the file fits.
+
+Usage:
+    python animation_export.py static/pinn_vs_nn_extrapolation.gif --target-kb 400
+"""
+import argparse
+import os
+import shutil
+import subprocess
+
+import numpy as np
+from PIL import Image, ImageSequence, features
+
+FORMATS = ("gif", "webp", "mp4", "webm")
+
+# Quality ladders tried in order when a target size is given
+GIF_COLORS = (255, 128, 64, 32)
+WEBP_QUALITY = (80, 60, 40)  # after a lossless first attempt
+VIDEO_CRF = {"mp4": (23, 28, 33, 38), "webm": (31, 37, 43, 49)}
+SCALES = (1.0, 0.75, 0.5)
+
+
+# --- 1. Frame Sources ---
+def load_gif_frames(path):
+    """Return ``(frames, duration_ms)`` with every frame as an RGB image."""
+    with Image.open(path) as im:
+        duration = im.info.get("duration", 33)
+        frames = [frame.convert("RGB") for frame in ImageSequence.Iterator(im)]
+    return frames, duration
+
+
+def to_images(frames):
+    """Accept PIL images or ``(H, W, 3|4)`` uint8 arrays (e.g. from ``pinn_render.render_frames``)."""
+    return [Image.fromarray(np.asarray(f)).convert("RGB") if not isinstance(f, Image.Image) else f.convert("RGB")
+            for f in frames]
+
+
+def rescale(frames, scale):
+    if scale == 1.0:
+        return frames
+    w, h = frames[0].size
+    size = (max(2, round(w * scale)), max(2, round(h * scale)))
+    return [f.resize(size, Image.Resampling.LANCZOS) for f in frames]
+
+
+# --- 2. Encoders ---
+def encode_gif(frames, path, duration, colors=255):
+    """GIF with a global palette and delta-cropped frames.
+
+    The palette is built from the first and last frames (the animation only adds
+    to the plot, so the last frame holds every colour). At most 255 colours are
+    used so Pillow has a free index for the transparent "unchanged" pixels.
+    """
+    colors = min(colors, 255)
+    first, last = frames[0], frames[-1]
+    sample = Image.new("RGB", (first.width, first.height * 2))
+    sample.paste(first, (0, 0))
+    sample.paste(last, (0, first.height))
+    palette = sample.quantize(colors=colors, method=Image.Quantize.MEDIANCUT)
+    indexed = [f.quantize(palette=palette, dither=Image.Dither.NONE) for f in frames]
+    indexed[0].save(path, save_all=True, append_images=indexed[1:], duration=duration, loop=0,
+                    optimize=True, disposal=1)
+
+
+def encode_webp(frames, path, duration, quality=80, lossless=False):
+    """Animated WebP; ``minimize_size`` lets libwebp store only the changed sub-rectangle per frame."""
+    if not features.check("webp"):
+        raise RuntimeError("Pillow was built without WebP support")
+    frames[0].save(path, format="WEBP", save_all=True, append_images=frames[1:], duration=duration, loop=0,
+                   quality=quality, lossless=lossless, allow_mixed=not lossless, method=4, minimize_size=True)
+
+
+def encode_video(frames, path, duration, crf, codec):
+    """Pipe raw RGB frames into ffmpeg (``codec`` is ``"mp4"`` for H.264 or ``"webm"`` for VP9)."""
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        raise RuntimeError("ffmpeg not found on PATH")
+    w, h = frames[0].size
+    cmd = [ffmpeg, "-y", "-loglevel", "error", "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{w}x{h}",
+           "-r", f"{1000 / duration:g}", "-i", "-", "-an",
+           # yuv420p needs even dimensions
+           "-vf", "pad=ceil(iw/2)*2:ceil(ih/2)*2", "-pix_fmt", "yuv420p"]
+    if codec == "mp4":
+        cmd += ["-c:v", "libx264", "-preset", "slow", "-crf", str(crf), "-movflags", "+faststart"]
+    else:
+        cmd += ["-c:v", "libvpx-vp9", "-crf", str(crf), "-b:v", "0", "-row-mt", "1"]
+    proc = subprocess.Popen(cmd + [path], stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        for frame in frames:
+            proc.stdin.write(frame.tobytes())
+    except OSError:
+        # ffmpeg exited early (e.g. built without this encoder); its stderr says why
+        pass
+    try:
+        _, stderr = proc.communicate()
+    except OSError:
+        # Flushing the remaining input can fail the same way
+        stderr = proc.stderr.read()
+        proc.wait()
+    if proc.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed: {stderr.decode(errors='replace').strip()}")
+
+
+def _ladder(fmt):
+    """``(label, encode(frames, path, duration))`` from best to smallest quality."""
+    if fmt == "gif":
+        return [(f"colors={c}", lambda fr, p, d, c=c: encode_gif(fr, p, d, colors=c)) for c in GIF_COLORS]
+    if fmt == "webp":
+        return [("lossless", lambda fr, p, d: encode_webp(fr, p, d, quality=50, lossless=True))] + \
+            [(f"quality={q}", lambda fr, p, d, q=q: encode_webp(fr, p, d, quality=q)) for q in WEBP_QUALITY]
+    if fmt in VIDEO_CRF:
+        return [(f"crf={c}", lambda fr, p, d, c=c: encode_video(fr, p, d, crf=c, codec=fmt)) for c in VIDEO_CRF[fmt]]
+    raise ValueError(f"Unknown format: {fmt!r}")
+
+
+# --- 3. Export with Size Budget ---
+def export_format(frames, fmt, path, duration, target_bytes=None, scale=1.0):
+    """Encode one format; returns ``{"path", "bytes", "settings"}``.
+
+    Without ``target_bytes`` the first (best) rung is used. Otherwise rungs are
+    tried at each scale until the file fits; if none does, the last (smallest)
+    attempt is kept.
+    """
+    ladder = _ladder(fmt)
+    scales = [scale * s for s in SCALES] if target_bytes else [scale]
+    for s in scales:
+        scaled = rescale(frames, s)
+        for label, encode in (ladder if target_bytes else ladder[:1]):
+            encode(scaled, path, duration)
+            size = os.path.getsize(path)
+            settings = f"{label}, scale={s:g}, {scaled[0].width}x{scaled[0].height}"
+            result = {"path": path, "bytes": size, "settings": settings}
+            if target_bytes is None or size <= target_bytes:
+                return result
+    return result
+
+
+def export_animation(frames, basename, duration=33, formats=FORMATS, target_bytes=None, scale=1.0):
+    """Write ``basename.<fmt>`` for every available format and return a size report per format."""
+    frames = to_images(frames)
+    report = {}
+    for fmt in formats:
+        try:
+            report[fmt] = export_format(frames, fmt, f"{basename}.{fmt}", duration, target_bytes, scale)
+        except RuntimeError as exc:
+            report[fmt] = {"skipped": str(exc)}
+    return report
+
+
+def print_report(report, source_bytes=None):
+    if source_bytes is not None:
+        print(f"{'source':>6}: {source_bytes:>10,} bytes")
+    for fmt, entry in report.items():
+        if "skipped" in entry:
+            print(f"{fmt:>6}: skipped ({entry['skipped']})")
+            continue
+        ratio = f" ({entry['bytes'] / source_bytes:.0%} of source)" if source_bytes else ""
+        print(f"{fmt:>6}: {entry['bytes']:>10,} bytes{ratio}  [{entry['settings']}] -> {entry['path']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-encode an animation in compact formats.")
+    parser.add_argument("source", help="Animated GIF to re-encode")
+    parser.add_argument("--formats", nargs="+", default=list(FORMATS), choices=FORMATS)
+    parser.add_argument("--target-kb", type=float, default=None, help="Size budget per file in kB")
+    parser.add_argument("--scale", type=float, default=1.0, help="Resize factor applied before encoding")
+    parser.add_argument("--out-dir", default=None, help="Defaults to the source directory")
+    args = parser.parse_args(argv)
+
+    frames, duration = load_gif_frames(args.source)
+    stem = os.path.splitext(os.path.basename(args.source))[0]
+    out_dir = args.out_dir or os.path.dirname(os.path.abspath(args.source))
+    os.makedirs(out_dir, exist_ok=True)
+    basename = os.path.join(out_dir, f"{stem}.optimized")
+    target = int(args.target_kb * 1024) if args.target_kb else None
+    report = export_animation(frames, basename, duration, args.formats, target, args.scale)
+    print_report(report, os.path.getsize(args.source))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,400 @@
+"""Benchmark suite with JSON results and regression checks against a baseline.
+
+Groups (select with ``--only``):
+
+* ``training``: NN and PINN epochs/s for several collocation sizes and torch
+  thread counts.
+* ``inference``: latency of ``predict`` on ``t_test`` (torch) and of the NumPy
+  runtime on the exported PINN.
+* ``render``: GIF render time and output bytes of ``save_animation``.
+* ``site``: cold start and per-rerun time of ``site_demo_24.py`` under
+  Streamlit's headless ``AppTest`` harness. It runs in a fresh process so the
+  cold start includes the imports; the modules imported and the peak RSS of
+  that process are recorded too. Per-session memory is the traced heap growth
+  per extra session that completes the guided conversation (harness included,
+  with the shared caches already warm), plus the pickled size of one
+  session's state. Per-click server time and elements sent for each turn of
+  the guided chat (and for a tag search after it) are measured on a live
+  ``streamlit run`` server: AppTest reruns the whole script for every click,
+  so fragment-scoped reruns only show up there.
+
+Every metric is stored with its unit and direction (higher or lower is
+better). ``compare`` flags metrics that got worse than the baseline by more
+than ``--tolerance``.
+
+Usage:
+    python benchmarks.py --save-baseline          # record benchmark_results/baseline.json
+    python benchmarks.py --fail-on-regression     # compare a new run against it
+    python benchmarks.py --only training --quick
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+
+RESULTS_DIR = "benchmark_results"
+GROUPS = ("training", "inference", "render", "site")
+
+
+def _metric(value, unit, better):
+    return {"value": value, "unit": unit, "better": better}
+
+
+def _median_time(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+# --- 1. Benchmarks ---
+def bench_training(collocation_sizes=(100, 1000, 10000), threads=None, epochs=300):
+    import torch
+
+    from pinn_vs_nn import A_train, create_network, k, t_max, t_min, t_train, train_nn, train_pinn
+
+    threads = threads or sorted({1, os.cpu_count() or 1})
+    previous = torch.get_num_threads()
+    metrics = {}
+    try:
+        for n_threads in threads:
+            torch.set_num_threads(n_threads)
+            torch.manual_seed(0)
+            model = create_network()
+            train_nn(model, t_train, A_train, epochs=10, log_every=0)  # warm-up
+            start = time.perf_counter()
+            train_nn(model, t_train, A_train, epochs=epochs, log_every=0)
+            metrics[f"training.nn.threads={n_threads}.epochs_per_s"] = _metric(
+                epochs / (time.perf_counter() - start), "epochs/s", "higher")
+            for n_points in collocation_sizes:
+                t_physics = torch.linspace(t_min, t_max, n_points).view(-1, 1)
+                torch.manual_seed(0)
+                model = create_network()
+                train_pinn(model, t_train, A_train, t_physics, k, epochs=10, log_every=0)
+                start = time.perf_counter()
+                train_pinn(model, t_train, A_train, t_physics, k, epochs=epochs, log_every=0)
+                metrics[f"training.pinn.points={n_points}.threads={n_threads}.epochs_per_s"] = _metric(
+                    epochs / (time.perf_counter() - start), "epochs/s", "higher")
+    finally:
+        torch.set_num_threads(previous)
+    return metrics
+
+
+def bench_inference(repeat=200, runtime_path="models/pinn_soft_sensor.npz"):
+    import torch
+
+    from pinn_vs_nn import create_network, predict, t_test
+
+    torch.manual_seed(0)
+    model = create_network()
+    metrics = {"inference.torch.t_test.latency_ms": _metric(
+        _median_time(lambda: predict(model, t_test), repeat) * 1000, "ms", "lower")}
+    if os.path.exists(runtime_path):
+        from mlp_runtime import load_runtime
+
+        runtime = load_runtime(runtime_path)
+        t_test_np = t_test.numpy()
+        metrics["inference.numpy_runtime.t_test.latency_ms"] = _metric(
+            _median_time(lambda: runtime.predict(t_test_np), repeat) * 1000, "ms", "lower")
+    return metrics
+
+
+def bench_render(total_frames=150, workers=1):
+    import numpy as np
+
+    from pinn_vs_nn import analytical_solution, save_animation, t_test
+
+    t_test_np = t_test.numpy()
+    A_real = analytical_solution(t_test_np)
+    # Any prediction curves will do; they only need to cross the legend like the real ones
+    A_pred_nn = A_real + 0.3 * np.sin(t_test_np)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "animation.gif")
+        seconds = save_animation(t_test_np, A_real, A_pred_nn, A_real, path=path, total_frames=total_frames,
+                                 workers=workers)
+        size = os.path.getsize(path)
+    return {f"render.gif.frames={total_frames}.seconds": _metric(seconds, "s", "lower"),
+            f"render.gif.frames={total_frames}.bytes": _metric(size, "bytes", "lower")}
+
+
+def _site_app(script):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(script, default_timeout=120)
+    at.secrets["demo_thinking_seconds"] = 0  # skip the guided chat's "thinking" pause
+    return at
+
+
+def _complete_conversation(at):
+    while at.button:  # one prompt button per step, none once the demo is over
+        at.button[0].click().run()
+        if at.session_state.is_thinking:
+            at.run()
+    return at
+
+
+def _site_profile(script, reruns, sessions):
+    # Runs in a fresh process: the first AppTest run pays for every import of the site
+    import pickle
+    import resource
+    import sys
+    import tracemalloc
+
+    modules_before = len(sys.modules)
+    from streamlit.testing.v1 import AppTest  # noqa: F401 (imported here so the cold start does not time it)
+
+    start = time.perf_counter()
+    at = _site_app(script)
+    at.run()
+    cold = time.perf_counter() - start
+    if at.exception:
+        raise RuntimeError(f"{script} raised: {at.exception[0].message}")
+    profile = {"cold": cold, "modules": len(sys.modules) - modules_before,
+               "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}
+    times = []
+    for _ in range(reruns):
+        start = time.perf_counter()
+        at.run()
+        times.append(time.perf_counter() - start)
+    profile["rerun"] = statistics.median(times)
+
+    _complete_conversation(at)  # warms the shared caches
+    # Older versions of the page also kept a "messages" list
+    state = {key: at.session_state[key] for key in ("messages", "conversation_step", "is_thinking")
+             if key in at.session_state}
+    profile["state_bytes"] = len(pickle.dumps(state))
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    apps = [_complete_conversation(_site_app(script).run()) for _ in range(sessions)]
+    profile["session_kb"] = (tracemalloc.get_traced_memory()[0] - before) / len(apps) / 1024
+    tracemalloc.stop()
+    return profile
+
+
+def bench_site(script="site_demo_24.py", reruns=10, sessions=5):
+    with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        profile = pool.submit(_site_profile, script, reruns, sessions).result()
+    return {"site.cold_start_s": _metric(profile["cold"], "s", "lower"),
+            "site.cold_start_modules": _metric(profile["modules"], "modules", "lower"),
+            "site.cold_start_peak_rss_mb": _metric(profile["peak_rss_mb"], "MiB", "lower"),
+            "site.rerun_ms": _metric(profile["rerun"] * 1000, "ms", "lower"),
+            "site.session_memory_kb": _metric(profile["session_kb"], "KiB", "lower"),
+            "site.session_state_bytes": _metric(profile["state_bytes"], "bytes", "lower")}
+
+
+class _LiveSession:
+    """One browser session on a live server, speaking the frontend's websocket protocol."""
+
+    def __init__(self, ws):
+        self.ws = ws
+        self.page_script_hash = ""
+
+    async def run(self, widgets=(), fragment_id=""):
+        """Request a (fragment) rerun; return ``(ms, elements sent, {label: (widget id, fragment id)})``.
+
+        A run that calls ``st.rerun`` counts together with its rerun, up to
+        the moment the server reports the session idle.
+        """
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        msg = BackMsg()
+        msg.rerun_script.page_script_hash = self.page_script_hash
+        msg.rerun_script.fragment_id = fragment_id
+        msg.rerun_script.widget_states.widgets.extend(widgets)
+        start = time.perf_counter()
+        await self.ws.send(msg.SerializeToString())
+        n_elements, inputs, finished = 0, {}, False
+        while True:
+            forward = ForwardMsg.FromString(await asyncio.wait_for(self.ws.recv(), 120))
+            kind = forward.WhichOneof("type")
+            if kind == "new_session":  # starts every run
+                self.page_script_hash = forward.new_session.page_script_hash
+                inputs = {}
+            elif kind == "delta":
+                n_elements += 1
+                element = forward.delta.new_element
+                if element.WhichOneof("type") in ("button", "text_input"):
+                    widget = getattr(element, element.WhichOneof("type"))
+                    inputs[widget.label] = (widget.id, forward.delta.fragment_id)
+            elif kind == "script_finished":
+                finished = forward.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN
+            elif kind == "session_status_changed" and finished and not forward.session_status_changed.script_is_running:
+                return (time.perf_counter() - start) * 1000, n_elements, inputs
+
+
+async def _live_conversation(url, search):
+    """Click through the guided chat, then search once; ``[(ms, elements)]`` per interaction."""
+    import websockets
+    from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+    async with websockets.connect(url, max_size=None) as ws:
+        session = _LiveSession(ws)
+        _, _, inputs = await session.run()
+        results = []
+        # Prompt buttons are the only buttons; the search box appears once the chat is over
+        while (prompts := [label for label in inputs if not label.startswith("Search")]):
+            widget_id, fragment_id = inputs[prompts[0]]
+            ms, n_elements, inputs = await session.run([WidgetState(id=widget_id, trigger_value=True)], fragment_id)
+            results.append((ms, n_elements))
+        (widget_id, fragment_id), = inputs.values()
+        ms, n_elements, _ = await session.run([WidgetState(id=widget_id, string_value=search)], fragment_id)
+        return results + [(ms, n_elements)]
+
+
+def bench_site_clicks(script="site_demo_24.py", sessions=3, search="r101 press"):
+    """Per-interaction server time and elements sent, medians over all but the first (cache-warming) session."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    with tempfile.TemporaryDirectory() as tmp:
+        secrets = os.path.join(tmp, "secrets.toml")
+        with open(secrets, "w", encoding="utf-8") as f:
+            f.write("demo_thinking_seconds = 0\n")
+        server = subprocess.Popen(
+            [sys.executable, "-m", "streamlit", "run", script, "--server.headless=true", "--server.address=127.0.0.1",
+             f"--server.port={port}", f"--secrets.files={secrets}", "--browser.gatherUsageStats=false"],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            deadline = time.perf_counter() + 60
+            while True:
+                try:
+                    urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=1)
+                    break
+                except OSError:
+                    if server.poll() is not None or time.perf_counter() > deadline:
+                        raise RuntimeError(f"streamlit run {script} did not start")
+                    time.sleep(0.1)
+            runs = [asyncio.run(_live_conversation(f"ws://127.0.0.1:{port}/_stcore/stream", search))
+                    for _ in range(sessions)]
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+    steady = runs[1:] or runs
+    metrics = {}
+    for i in range(len(steady[0])):
+        name = f"turn={i + 1}" if i < len(steady[0]) - 1 else "search"
+        metrics[f"site.click.{name}.ms"] = _metric(statistics.median(run[i][0] for run in steady), "ms", "lower")
+        metrics[f"site.click.{name}.elements"] = _metric(steady[-1][i][1], "elements", "lower")
+    return metrics
+
+
+# --- 2. Results and Regression Checks ---
+def run_suite(groups=GROUPS, quick=False):
+    metrics = {}
+    for group in groups:
+        start = time.perf_counter()
+        if group == "training":
+            metrics.update(bench_training(collocation_sizes=(100, 1000) if quick else (100, 1000, 10000),
+                                          epochs=100 if quick else 300))
+        elif group == "inference":
+            metrics.update(bench_inference(repeat=50 if quick else 200))
+        elif group == "render":
+            metrics.update(bench_render(total_frames=30 if quick else 150))
+        elif group == "site":
+            metrics.update(bench_site(reruns=3 if quick else 10, sessions=2 if quick else 5))
+            metrics.update(bench_site_clicks(sessions=2 if quick else 4))
+        else:
+            raise ValueError(f"Unknown benchmark group: {group!r}")
+        print(f"{group}: done in {time.perf_counter() - start:.1f}s")
+    return {"meta": run_metadata(quick), "metrics": metrics}
+
+
+def run_metadata(quick):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    import numpy as np
+    import torch
+
+    return {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"), "commit": commit, "quick": quick,
+        "python": platform.python_version(), "platform": platform.platform(), "cpu_count": os.cpu_count(),
+        "torch": torch.__version__, "numpy": np.__version__,
+    }
+
+
+def save_results(results, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+
+
+def load_results(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare(results, baseline, tolerance=0.10):
+    """Per-metric change against ``baseline``; a change worse than ``tolerance`` is a regression."""
+    rows = []
+    for name, metric in sorted(results["metrics"].items()):
+        base = baseline["metrics"].get(name)
+        if base is None or not base["value"]:
+            rows.append({"name": name, "value": metric["value"], "baseline": None, "change": None,
+                         "regression": False})
+            continue
+        change = metric["value"] / base["value"] - 1
+        worse = -change if metric["better"] == "higher" else change
+        rows.append({"name": name, "value": metric["value"], "baseline": base["value"], "change": change,
+                     "regression": worse > tolerance})
+    return rows
+
+
+def print_results(results, rows=None):
+    rows = rows or [{"name": n, "value": m["value"], "baseline": None, "change": None, "regression": False}
+                    for n, m in sorted(results["metrics"].items())]
+    for row in rows:
+        unit = results["metrics"][row["name"]]["unit"]
+        line = f"{row['name']:<48} {row['value']:>14,.3f} {unit}"
+        if row["change"] is not None:
+            line += f"  (baseline {row['baseline']:,.3f}, {row['change']:+.1%})"
+            if row["regression"]:
+                line += "  REGRESSION"
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--only", default=",".join(GROUPS), help=f"Comma-separated subset of {','.join(GROUPS)}")
+    parser.add_argument("--quick", action="store_true", help="Fewer epochs, frames and reruns")
+    parser.add_argument("--out", default=os.path.join(RESULTS_DIR, "latest.json"))
+    parser.add_argument("--baseline", default=os.path.join(RESULTS_DIR, "baseline.json"))
+    parser.add_argument("--save-baseline", action="store_true", help="Also store this run as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed relative slowdown (default 10%%)")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args(argv)
+
+    results = run_suite([g.strip() for g in args.only.split(",") if g.strip()], quick=args.quick)
+    save_results(results, args.out)
+    rows = None
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        rows = compare(results, load_results(args.baseline), args.tolerance)
+    print_results(results, rows)
+    print(f"\nResults written to '{args.out}'.")
+    if args.save_baseline:
+        save_results(results, args.baseline)
+        print(f"Baseline written to '{args.baseline}'.")
+    if rows and any(row["regression"] for row in rows):
+        print(f"{sum(row['regression'] for row in rows)} metric(s) regressed by more than {args.tolerance:.0%}.")
+        if args.fail_on_regression:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""Fine-tune a base PINN for a whole fleet of similar assets in one batched pass.
+
+Starts every asset from the same base checkpoint (the exported PINN in
+``models/pinn_soft_sensor.npz``, a ``ModelCache`` key or a ``create_network``
+model) and fine-tunes all of them together:
+
+* The upper layers are stacked per asset in an ``EnsembleMLP``, so each layer
+  is one ``baddbmm`` for the whole fleet.
+* The lower ``frozen_layers`` hidden layers are shared and frozen. Their
+  features and time derivatives at the fixed training and collocation points
+  are computed once before training, not every epoch.
+* Each asset has its own rate constant ``k`` and initial concentration ``A0``,
+  either given or learnable. The network output is scaled by ``A0``. The
+  physics residual ``dA/dt + k*A`` is applied to the unscaled output, which
+  is equivalent because the ODE is linear.
+
+Usage:
+    python fleet_finetune.py --assets 200 --epochs 3000 --frozen-layers 2
+"""
+import argparse
+import copy
+import time
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from model_cache import ModelCache
+from pinn_ensemble import EnsembleMLP, member_mse
+from pinn_residual import value_and_derivative_tangent
+from pinn_vs_nn import create_network, k as base_k, make_training_data, n_physics_points, t_max, t_max_train, t_min
+
+BASE_CHECKPOINT = "models/pinn_soft_sensor.npz"
+
+
+# --- 1. Base Checkpoint ---
+def load_base(checkpoint=BASE_CHECKPOINT):
+    """``create_network``-style model from an ``nn.Module``, an exported ``.npz`` or a ``ModelCache`` key."""
+    if isinstance(checkpoint, nn.Module):
+        return copy.deepcopy(checkpoint)
+    if str(checkpoint).endswith(".npz"):
+        from mlp_runtime import load_runtime, to_torch
+        return to_torch(load_runtime(checkpoint))
+    entry = ModelCache().load(checkpoint)
+    if entry is None:
+        raise KeyError(f"No cached model {checkpoint!r}")
+    model = create_network()
+    model.load_state_dict(entry["state_dict"])
+    return model
+
+
+# --- 2. Fleet Model ---
+class FleetPINN(nn.Module):
+    """``n_assets`` copies of ``base``: shared frozen lower layers, stacked trainable upper layers.
+
+    ``k`` and ``A0`` are scalars or ``(n_assets,)`` values; with ``learn_k`` /
+    ``learn_A0`` they are initial guesses that get fitted per asset (``k``
+    through its log, so it stays positive).
+    """
+
+    def __init__(self, base, n_assets, k=base_k, A0=1.0, learn_k=False, learn_A0=False, frozen_layers=0):
+        super().__init__()
+        layers = list(base)
+        n_hidden = sum(isinstance(layer, nn.Linear) for layer in layers) - 1
+        if not 0 <= frozen_layers <= n_hidden:
+            raise ValueError(f"frozen_layers must be between 0 and {n_hidden}")
+        # Hidden layers are Linear + Tanh pairs
+        self.frozen = copy.deepcopy(nn.Sequential(*layers[:2 * frozen_layers]))
+        self.frozen.requires_grad_(False)
+        head = nn.Sequential(*layers[2 * frozen_layers:])
+        self.heads = EnsembleMLP([head] * n_assets)
+        self.n_assets = n_assets
+
+        def per_asset(value):
+            return torch.as_tensor(np.broadcast_to(np.asarray(value, dtype=np.float32), (n_assets,)).copy()).view(-1, 1, 1)
+
+        log_k, A0 = per_asset(k).log(), per_asset(A0)
+        self.log_k = nn.Parameter(log_k) if learn_k else nn.Parameter(log_k, requires_grad=False)
+        self.A0 = nn.Parameter(A0) if learn_A0 else nn.Parameter(A0, requires_grad=False)
+
+    @property
+    def k(self):
+        return self.log_k.exp()
+
+    def features(self, t):
+        """Frozen-layer features and their time derivatives (constant for fixed ``t``)."""
+        with torch.no_grad():
+            return value_and_derivative_tangent(self.frozen, t)
+
+    def forward(self, t, features=None):
+        h, _ = features if features is not None else self.features(t)
+        return self.A0 * self.heads(h)
+
+    def residual(self, t, features=None):
+        """Physics residual of the unscaled output at ``t``, shape ``(n_assets, P, 1)``."""
+        h, dh = features if features is not None else self.features(t)
+        f, df_dt = self.heads.forward_with_derivative(h, dh)
+        return df_dt + self.k * f
+
+    def trainable_parameters(self):
+        return [p for p in self.parameters() if p.requires_grad]
+
+    def to_ensemble(self):
+        """Fold the frozen layers and ``A0`` into a plain ``EnsembleMLP`` (e.g. for ``mlp_runtime.export_mlp``).
+
+        The layer sizes are taken from the model itself, so bases of any width, depth or output count work.
+        """
+        networks = []
+        for i in range(self.n_assets):
+            head = self.heads.member(i)
+            with torch.no_grad():
+                head[-1].weight.mul_(self.A0[i, 0, 0])
+                head[-1].bias.mul_(self.A0[i, 0, 0])
+            networks.append(nn.Sequential(*copy.deepcopy(list(self.frozen)), *head))
+        return EnsembleMLP(networks)
+
+
+# --- 3. Fleet Data and Fine-tuning ---
+def make_fleet_data(n_assets, k_range=(0.3, 0.8), A0_range=(0.8, 1.2), noise=0.03, seed=0):
+    """Per-asset ``k`` and ``A0`` and noisy training data on ``[t_min, t_max_train]``.
+
+    Returns ``t_train (P, 1)``, ``A_train (N, P, 1)``, ``k (N,)`` and ``A0 (N,)``.
+    """
+    rng = np.random.RandomState(seed)
+    ks = rng.uniform(*k_range, n_assets)
+    A0s = rng.uniform(*A0_range, n_assets)
+    A_train_np = []
+    for i, (k_i, A0_i) in enumerate(zip(ks, A0s)):
+        t_train_np, A_i = make_training_data(noise_std=noise, k=k_i, A0=A0_i, seed=seed + 1 + i)
+        A_train_np.append(A_i)
+    t_train = torch.tensor(t_train_np).float().view(-1, 1)
+    A_train = torch.tensor(np.stack(A_train_np)).float().unsqueeze(-1)
+    return t_train, A_train, ks, A0s
+
+
+def finetune_fleet(model, t_train, A_train, t_physics, epochs=3000, lr=1e-3, log_every=500):
+    """Adam on the summed per-asset data + physics losses; returns the final per-asset loss ``(N,)``."""
+    train_features = model.features(t_train)
+    physics_features = model.features(t_physics)
+    optimizer = torch.optim.Adam(model.trainable_parameters(), lr=lr)
+    for epoch in range(epochs):
+        optimizer.zero_grad()
+        loss_data = member_mse(model(t_train, train_features), A_train)
+        loss_physics = (model.residual(t_physics, physics_features) ** 2).mean(dim=(1, 2))
+        loss = loss_data + loss_physics
+        loss.sum().backward()
+        optimizer.step()
+        if log_every and (epoch + 1) % log_every == 0:
+            print(f'Fleet Epoch [{epoch+1}/{epochs}], Loss mean: {loss.mean().item():.6f}, max: {loss.max().item():.6f} '
+                  f'(Data: {loss_data.mean().item():.6f}, Physics: {loss_physics.mean().item():.6f})')
+    return loss.detach()
+
+
+def fleet_extrapolation_rmse(model, t_test, ks, A0s):
+    """RMSE per asset against its own analytical solution for ``t > t_max_train``."""
+    t_ext = t_test[t_test.squeeze(-1) > t_max_train]
+    with torch.no_grad():
+        pred = model(t_ext)
+    k = torch.as_tensor(ks, dtype=torch.float32).view(-1, 1, 1)
+    A0 = torch.as_tensor(A0s, dtype=torch.float32).view(-1, 1, 1)
+    return member_mse(pred, A0 * torch.exp(-k * t_ext.unsqueeze(0))).sqrt().numpy()
+
+
+def single_run_seconds(t_train, A_train, t_physics, k, epochs=20000, sample_epochs=200):
+    """Estimated time of one ``train_pinn`` run per asset, timed over ``sample_epochs``."""
+    from pinn_vs_nn import train_pinn
+
+    start = time.perf_counter()
+    train_pinn(create_network(), t_train, A_train[0], t_physics, float(k), epochs=sample_epochs, log_every=0)
+    return (time.perf_counter() - start) / sample_epochs * epochs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--checkpoint", default=BASE_CHECKPOINT, help="Exported .npz or ModelCache key")
+    parser.add_argument("--assets", type=int, default=200)
+    parser.add_argument("--epochs", type=int, default=3000)
+    parser.add_argument("--lr", type=float, default=1e-3)
+    parser.add_argument("--frozen-layers", type=int, default=2)
+    parser.add_argument("--given-k", action="store_true", help="Use the true k per asset instead of learning it")
+    parser.add_argument("--export", default=None, help="Write the fine-tuned fleet to this .npz (mlp_runtime format)")
+    args = parser.parse_args(argv)
+
+    t_train, A_train, ks, A0s = make_fleet_data(args.assets)
+    t_physics = torch.linspace(t_min, t_max, n_physics_points).view(-1, 1)
+    t_test = torch.linspace(t_min, t_max, 300).view(-1, 1)
+    base = load_base(args.checkpoint)
+
+    # Learnable parameters start from the base process (k = 0.5) and the first measurement
+    k_init = ks if args.given_k else base_k
+    model = FleetPINN(base, args.assets, k=k_init, A0=A_train[:, 0, 0].numpy(), learn_k=not args.given_k,
+                      learn_A0=True, frozen_layers=args.frozen_layers)
+    n_trainable = sum(p.numel() for p in model.trainable_parameters())
+    print(f"Fine-tuning {args.assets} assets from '{args.checkpoint}' ({args.frozen_layers} frozen layers, "
+          f"{n_trainable:,} trainable parameters, k {'given' if args.given_k else 'learned'}).")
+    rmse_before = fleet_extrapolation_rmse(model, t_test, ks, A0s)
+
+    start = time.perf_counter()
+    finetune_fleet(model, t_train, A_train, t_physics, epochs=args.epochs, lr=args.lr)
+    elapsed = time.perf_counter() - start
+
+    rmse = fleet_extrapolation_rmse(model, t_test, ks, A0s)
+    k_error = np.abs(model.k.detach().view(-1).numpy() - ks)
+    sequential = single_run_seconds(t_train, A_train, t_physics, ks[0]) * args.assets
+    print(f"\nFleet fine-tuning: {elapsed:.1f}s for {args.assets} assets x {args.epochs} epochs "
+          f"(~{sequential / 60:.0f} min estimated for {args.assets} separate 20k-epoch train_pinn runs)")
+    print(f"Extrapolation RMSE: base {np.median(rmse_before):.4f} -> fine-tuned median {np.median(rmse):.4f}, "
+          f"90th percentile {np.percentile(rmse, 90):.4f}")
+    if not args.given_k:
+        print(f"Learned k: median abs error {np.median(k_error):.4f}, max {k_error.max():.4f}")
+
+    if args.export:
+        from mlp_runtime import export_mlp
+        export_mlp(model.to_ensemble(), args.export, k=model.k.detach().view(-1).tolist(),
+                   A0=model.A0.detach().view(-1).tolist(), base=str(args.checkpoint))
+        print(f"Exported the fleet to '{args.export}'.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,353 @@
+"""Local knowledge store behind the MVP chat.
+
+Tags, maintenance history and document metadata are bulk-loaded from the CSV
+files in ``knowledge/`` into a SQLite database (``knowledge/knowledge.db``).
+The database is rebuilt only when a CSV file is newer than it. Structured
+lookups go through B-tree indexes on unit/asset/tag type/process. Free text
+goes through FTS5 indexes (``tags_fts`` and ``documents_fts``). These are
+external-content tables over the base tables, so no text is stored twice.
+
+One ``KnowledgeStore`` is meant to be opened per server process (the site
+wraps ``open_store`` in ``st.cache_resource``). The connection is shared
+across the script threads under a lock.
+
+Usage:
+    python knowledge_store.py --bench 500000
+"""
+import argparse
+import csv
+import os
+import pathlib
+import random
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+
+KNOWLEDGE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "knowledge")
+DB_NAME = "knowledge.db"
+SCHEMA_VERSION = 2
+# Text matches are ranked by BM25 over all matches. A broad query ("pi" over
+# 500k tags) can take a second to score, so ranking gets RANK_BUDGET seconds;
+# past that, the query is interrupted and only the first RANK_WINDOW matches
+# (in load order) are ranked, an approximate top-N.
+RANK_BUDGET = 0.1
+RANK_WINDOW = 200
+
+TAG_FIELDS = ("tag_id", "description", "tag_type", "unit", "asset", "process", "stage", "notes")
+MAINTENANCE_FIELDS = ("unit", "asset", "asset_class", "asset_description", "date", "description", "cost", "source")
+DOCUMENT_FIELDS = ("doc_id", "kind", "title", "unit", "process", "source")
+
+SCHEMA = """
+CREATE TABLE tags (
+    tag_id TEXT PRIMARY KEY, description TEXT NOT NULL, tag_type TEXT, unit TEXT, asset TEXT,
+    process TEXT, stage TEXT, notes TEXT
+);
+CREATE INDEX tags_unit_type ON tags (unit, tag_type);
+CREATE INDEX tags_unit_process ON tags (unit, process, stage);
+CREATE INDEX tags_asset ON tags (asset);
+CREATE VIRTUAL TABLE tags_fts USING fts5 (
+    tag_id, description, asset, process, stage, notes, content='tags', content_rowid='rowid', prefix='2 3'
+);
+
+CREATE TABLE maintenance (
+    id INTEGER PRIMARY KEY, unit TEXT, asset TEXT, asset_class TEXT, asset_description TEXT,
+    date TEXT NOT NULL, description TEXT, cost REAL, source TEXT
+);
+CREATE INDEX maintenance_unit_class ON maintenance (unit, asset_class, date);
+CREATE INDEX maintenance_asset ON maintenance (asset, date);
+
+CREATE TABLE documents (
+    doc_id TEXT PRIMARY KEY, kind TEXT, title TEXT NOT NULL, unit TEXT, process TEXT, source TEXT
+);
+CREATE INDEX documents_process ON documents (process, kind);
+CREATE VIRTUAL TABLE documents_fts USING fts5 (doc_id, title, content='documents', content_rowid='rowid');
+"""
+
+
+# --- 1. Bulk Loading ---
+def read_csv(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        yield from csv.DictReader(f)
+
+
+def _rows(records, fields):
+    # Empty CSV cells are stored as NULL so that filters compare cleanly
+    for record in records:
+        yield tuple(record.get(field) or None for field in fields)
+
+
+def create_schema(conn):
+    conn.executescript(SCHEMA)
+    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+
+def bulk_load(conn, tags=(), maintenance=(), documents=()):
+    """Insert records (dicts or CSV rows) in one transaction, then rebuild the FTS indexes.
+
+    Rebuilding once after the load is much faster than keeping the FTS index
+    up to date row by row; ``optimize`` then merges it into a single b-tree.
+    """
+    with conn:
+        conn.executemany(f"INSERT INTO tags ({', '.join(TAG_FIELDS)}) VALUES ({', '.join('?' * len(TAG_FIELDS))})",
+                         _rows(tags, TAG_FIELDS))
+        conn.executemany(f"INSERT INTO maintenance ({', '.join(MAINTENANCE_FIELDS)}) "
+                         f"VALUES ({', '.join('?' * len(MAINTENANCE_FIELDS))})", _rows(maintenance, MAINTENANCE_FIELDS))
+        conn.executemany(f"INSERT INTO documents ({', '.join(DOCUMENT_FIELDS)}) "
+                         f"VALUES ({', '.join('?' * len(DOCUMENT_FIELDS))})", _rows(documents, DOCUMENT_FIELDS))
+        conn.execute("INSERT INTO tags_fts (tags_fts) VALUES ('rebuild')")
+        conn.execute("INSERT INTO documents_fts (documents_fts) VALUES ('rebuild')")
+        conn.execute("INSERT INTO tags_fts (tags_fts) VALUES ('optimize')")
+    conn.execute("ANALYZE")
+
+
+def source_files(source_dir):
+    return {name: os.path.join(source_dir, f"{name}.csv") for name in ("tags", "maintenance", "documents")}
+
+
+def build_database(source_dir=KNOWLEDGE_DIR, db_path=None):
+    """Load the CSV files in ``source_dir`` into a fresh database at ``db_path``.
+
+    The database is written to a temporary file and moved into place, so a
+    concurrent reader never sees a half-built file.
+    """
+    db_path = db_path or os.path.join(source_dir, DB_NAME)
+    fd, tmp_path = tempfile.mkstemp(suffix=".db.tmp", dir=os.path.dirname(os.path.abspath(db_path)))
+    os.close(fd)
+    try:
+        conn = sqlite3.connect(tmp_path)
+        try:
+            create_schema(conn)
+            bulk_load(conn, **{name: read_csv(path) if os.path.exists(path) else ()
+                               for name, path in source_files(source_dir).items()})
+        finally:
+            conn.close()
+        os.replace(tmp_path, db_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return db_path
+
+
+def is_stale(source_dir, db_path):
+    if not os.path.exists(db_path):
+        return True
+    db_mtime = os.path.getmtime(db_path)
+    if any(os.path.exists(p) and os.path.getmtime(p) > db_mtime for p in source_files(source_dir).values()):
+        return True
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION
+
+
+# --- 2. Queries ---
+def fts_query(text):
+    """Turn free text into an FTS5 query: every word must match, the last one as a prefix.
+
+    Words are split like the FTS tokenizer splits the indexed text, and each
+    word is quoted, so user input cannot inject FTS syntax. Only the last word
+    is a prefix (as typed so far): prefix terms merge the doclists of every
+    matching token, which is what made broad queries slow. A single-character
+    last word is matched as a whole word, since the prefix index starts at two.
+    """
+    words = re.findall(r"\w+", text.lower())
+    terms = [f'"{word}"' for word in words]
+    if words and len(words[-1]) >= 2:
+        terms[-1] += "*"
+    return " ".join(terms)
+
+
+class KnowledgeStore:
+    """Read-only query API over the knowledge database."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+
+    @classmethod
+    def open(cls, db_path):
+        # Streamlit runs each session's script in its own thread. as_uri() percent-encodes
+        # '?', '#' and '%' in the path, which would otherwise end or garble the URI.
+        uri = pathlib.Path(db_path).resolve().as_uri() + "?mode=ro"
+        return cls(sqlite3.connect(uri, uri=True, check_same_thread=False))
+
+    def _query(self, sql, params=(), budget=None):
+        """Rows as dicts; with a ``budget`` in seconds, raises ``sqlite3.OperationalError`` when it runs out."""
+        with self._lock:
+            if budget is None:
+                return [dict(row) for row in self.conn.execute(sql, params)]
+            deadline = time.perf_counter() + budget
+            self.conn.set_progress_handler(lambda: time.perf_counter() > deadline, 1000)
+            try:
+                return [dict(row) for row in self.conn.execute(sql, params)]
+            finally:
+                self.conn.set_progress_handler(None, 0)
+
+    def search_tags(self, text="", unit=None, tag_type=None, asset=None, process=None, stage=None, limit=50):
+        """Tags matching every given filter and, if ``text`` is set, every word of it.
+
+        Text matches are the ``limit`` best by BM25. If ranking every match
+        takes longer than ``RANK_BUDGET``, they are the best among the first
+        ``RANK_WINDOW`` matches instead (approximate). Filter-only results
+        come in load order.
+        """
+        filters = {"unit": unit, "tag_type": tag_type, "asset": asset, "process": process, "stage": stage}
+        where = [f"t.{column} = ?" for column, value in filters.items() if value is not None]
+        params = [value for value in filters.values() if value is not None]
+        match = fts_query(text)
+        if match:
+            matches = (f"SELECT t.*, tags_fts.rank AS _rank FROM tags_fts JOIN tags t ON t.rowid = tags_fts.rowid "
+                       f"WHERE tags_fts MATCH ?{''.join(' AND ' + w for w in where)}")
+            try:
+                rows = self._query(f"{matches} ORDER BY tags_fts.rank LIMIT ?", [match, *params, limit],
+                                   budget=RANK_BUDGET)
+            except sqlite3.OperationalError as e:
+                if "interrupted" not in str(e):
+                    raise
+                rows = self._query(f"SELECT * FROM ({matches} LIMIT ?) ORDER BY _rank LIMIT ?",
+                                   [match, *params, max(limit, RANK_WINDOW), limit])
+            for row in rows:
+                del row["_rank"]
+            return rows
+        sql = f"SELECT t.* FROM tags t{' WHERE ' + ' AND '.join(where) if where else ''} ORDER BY t.rowid LIMIT ?"
+        return self._query(sql, [*params, limit])
+
+    def tag(self, tag_id):
+        rows = self._query("SELECT * FROM tags WHERE tag_id = ?", (tag_id,))
+        return rows[0] if rows else None
+
+    def maintenance_history(self, unit=None, asset_class=None, asset=None, limit=200):
+        """Maintenance records, grouped by asset and newest first within each asset."""
+        filters = {"unit": unit, "asset_class": asset_class, "asset": asset}
+        where = [f"{column} = ?" for column, value in filters.items() if value is not None]
+        params = [value for value in filters.values() if value is not None]
+        sql = (f"SELECT * FROM maintenance{' WHERE ' + ' AND '.join(where) if where else ''} "
+               f"ORDER BY asset, date DESC LIMIT ?")
+        return self._query(sql, [*params, limit])
+
+    def documents(self, text="", process=None, kind=None, unit=None, limit=20):
+        filters = {"process": process, "kind": kind, "unit": unit}
+        where = [f"d.{column} = ?" for column, value in filters.items() if value is not None]
+        params = [value for value in filters.values() if value is not None]
+        match = fts_query(text)
+        if match:
+            sql = (f"SELECT d.* FROM documents_fts JOIN documents d ON d.rowid = documents_fts.rowid "
+                   f"WHERE documents_fts MATCH ?{''.join(' AND ' + w for w in where)} "
+                   f"ORDER BY documents_fts.rank LIMIT ?")
+            return self._query(sql, [match, *params, limit])
+        sql = f"SELECT d.* FROM documents d{' WHERE ' + ' AND '.join(where) if where else ''} ORDER BY d.rowid LIMIT ?"
+        return self._query(sql, [*params, limit])
+
+    def counts(self):
+        return {table: self._query(f"SELECT COUNT(*) AS n FROM {table}")[0]["n"]
+                for table in ("tags", "maintenance", "documents")}
+
+    def close(self):
+        self.conn.close()
+
+
+def open_store(source_dir=KNOWLEDGE_DIR, db_path=None):
+    """Open the knowledge database, (re)building it from the CSV files if it is missing or stale.
+
+    If the database cannot be built or opened (a read-only directory, an
+    unreadable or corrupt file), the CSV files are loaded into an in-memory
+    database instead.
+    """
+    db_path = db_path or os.path.join(source_dir, DB_NAME)
+    try:
+        if is_stale(source_dir, db_path):
+            build_database(source_dir, db_path)
+        return KnowledgeStore.open(db_path)
+    except (OSError, sqlite3.Error):
+        conn = sqlite3.connect(":memory:", check_same_thread=False)
+        create_schema(conn)
+        bulk_load(conn, **{name: read_csv(path) if os.path.exists(path) else ()
+                           for name, path in source_files(source_dir).items()})
+        return KnowledgeStore(conn)
+
+
+# --- 3. Synthetic Corpus and Latency Benchmark ---
+TAG_TYPES = {
+    "TEMP-PV": ("Temperature", "Temperature"), "PRESS-PV": ("Pressure", "Pressure"), "FLOW": ("Flow", "Flow"),
+    "LEVEL": ("Level", "Level"), "PH": ("pH", "pH"), "O2": ("Dissolved Oxygen (DO)", "Dissolved Oxygen"),
+    "RUN": ("Motor", "Status"), "VIB": ("Vibration", "Vibration"), "SPEED": ("Speed", "Speed"),
+}
+ASSET_CLASSES = {"R": "Reactor", "P": "Pump", "F": "Fermentor", "E": "Heat Exchanger", "T": "Tank", "C": "Compressor"}
+PROCESSES = ("Salicylic Acid Manufacturing", "Stem Cell Fermentation", "Sulfation", "Utilities", "Wastewater Treatment")
+STAGES = ("Feed Preparation", "Synthesis Reactor", "Separation", "Product Transfer", "Storage")
+
+
+def synthetic_tags(n, seed=0):
+    """``n`` plausible, unique tag records (for benchmarks).
+
+    The tag index is decomposed into measurement, asset number, asset class and
+    unit, so every unit holds 48,600 tags (9 measurements x 900 assets x 6 classes).
+    """
+    rng = random.Random(seed)
+    suffixes, prefixes = list(TAG_TYPES), list(ASSET_CLASSES)
+    for i in range(n):
+        i, suffix = divmod(i, len(suffixes))
+        i, number = divmod(i, 900)
+        unit, prefix = divmod(i, len(prefixes))
+        prefix, suffix, unit = prefixes[prefix], suffixes[suffix], unit + 1
+        asset = f"{prefix}-{100 + number}"
+        tag_type, measure = TAG_TYPES[suffix]
+        yield {
+            "tag_id": f"PI-U{unit}-{prefix}{100 + number}-{suffix}", "tag_type": tag_type,
+            "description": f"{ASSET_CLASSES[prefix]} {asset} {measure}", "unit": f"Unit {unit}", "asset": asset,
+            "process": rng.choice(PROCESSES), "stage": rng.choice(STAGES), "notes": None,
+        }
+
+
+def benchmark(n_tags=500_000, repeat=20):
+    """Build an in-memory store with ``n_tags`` synthetic tags and time typical chat queries."""
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    create_schema(conn)
+    start = time.perf_counter()
+    bulk_load(conn, tags=synthetic_tags(n_tags))
+    print(f"Loaded {n_tags:,} tags in {time.perf_counter() - start:.1f}s")
+    store = KnowledgeStore(conn)
+    queries = {
+        "exact tag id": lambda: store.tag("PI-U3-R101-TEMP-PV"),
+        "unit + tag type": lambda: store.search_tags(unit="Unit 7", tag_type="Temperature"),
+        "unit + process + stage": lambda: store.search_tags(unit="Unit 2", process="Salicylic Acid Manufacturing",
+                                                            stage="Synthesis Reactor"),
+        "asset": lambda: store.search_tags(asset="P-103"),
+        "text 'reactor temperature'": lambda: store.search_tags("reactor temperature"),
+        "text 'R101 pressure' in unit": lambda: store.search_tags("R101 pressure", unit="Unit 3"),
+        "text prefix 'vib'": lambda: store.search_tags("vib"),
+        "text prefix 'pi' (every tag)": lambda: store.search_tags("pi"),
+        "text in unit, typed so far": lambda: store.search_tags("pump vibr", unit="Unit 5"),
+    }
+    for label, query in queries.items():
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            rows = query()
+            times.append(time.perf_counter() - start)
+        n_rows = len(rows) if isinstance(rows, list) else int(rows is not None)
+        print(f"{label:>28}: median {sorted(times)[len(times) // 2] * 1000:7.2f} ms, max {max(times) * 1000:7.2f} ms"
+              f" ({n_rows} rows)")
+    store.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild knowledge/knowledge.db from the CSV files")
+    parser.add_argument("--bench", type=int, default=None, metavar="N_TAGS",
+                        help="Time queries over a synthetic corpus of N_TAGS tags")
+    args = parser.parse_args(argv)
+
+    if args.bench:
+        benchmark(args.bench)
+        return
+    if args.rebuild:
+        build_database()
+    store = open_store()
+    print(store.counts())
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
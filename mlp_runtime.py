@@ -0,0 +1,222 @@
+"""NumPy-only inference runtime for the exported PINN / NN models.
+
+``export_mlp`` writes a trained Linear/Tanh network (an ``nn.Sequential`` from
+``create_network``, a list of them, or an ``EnsembleMLP``) to a small ``.npz``
+file: stacked weights ``W{i}`` of shape ``(members, in, out)``, biases ``b{i}``,
+the activation of every layer and a JSON metadata string. ``MLPRuntime`` loads
+that file and evaluates it with ``np.matmul`` into per-thread preallocated
+layer buffers, ``max_batch`` points at a time. The web process can serve
+predictions without importing torch (several seconds and a few hundred MB per
+worker); this module only imports torch inside the export and check helpers.
+
+Usage:
+    python mlp_runtime.py models/pinn_soft_sensor.npz
+"""
+import argparse
+import json
+import threading
+import time
+
+import numpy as np
+
+ACTIVATIONS = {"tanh": lambda buf: np.tanh(buf, out=buf), "identity": lambda buf: buf}
+
+
+# --- 1. Export (torch side) ---
+def _stacked_layers(model):
+    """``(weights, biases, activations)`` with weights ``(members, in, out)`` and biases ``(members, 1, out)``."""
+    if hasattr(model, "n_members"):  # EnsembleMLP: already stacked
+        weights = [w.detach().cpu().numpy() for w in model.weights]
+        biases = [b.detach().cpu().numpy() for b in model.biases]
+        return weights, biases, ["tanh"] * (len(weights) - 1) + ["identity"]
+    networks = model if isinstance(model, (list, tuple)) else [model]
+    per_network = []
+    for net in networks:
+        layers, activations = [], []
+        for module in net:
+            name = type(module).__name__
+            if name == "Linear":
+                layers.append((module.weight.detach().cpu().numpy().T, module.bias.detach().cpu().numpy()[None, :]))
+                activations.append("identity")
+            elif name == "Tanh" and layers:
+                activations[-1] = "tanh"
+            else:
+                raise ValueError(f"Unsupported layer for export: {name}")
+        per_network.append((layers, activations))
+    activations = per_network[0][1]
+    if any(acts != activations for _, acts in per_network):
+        raise ValueError("All networks must have the same architecture")
+    weights = [np.stack([layers[i][0] for layers, _ in per_network]) for i in range(len(activations))]
+    biases = [np.stack([layers[i][1] for layers, _ in per_network]) for i in range(len(activations))]
+    return weights, biases, activations
+
+
+def export_mlp(model, path, dtype=np.float32, **metadata):
+    """Write ``model`` to ``path`` (``.npz``); ``metadata`` must be JSON-serialisable."""
+    weights, biases, activations = _stacked_layers(model)
+    arrays = {f"W{i}": w.astype(dtype) for i, w in enumerate(weights)}
+    arrays.update({f"b{i}": b.astype(dtype) for i, b in enumerate(biases)})
+    np.savez(path, activations=np.array(activations), metadata=np.array(json.dumps(metadata, sort_keys=True)),
+             **arrays)
+    return path
+
+
+def check_against_torch(model, runtime, t, atol=1e-5):
+    """Max abs difference between ``model(t)`` in torch and ``runtime.predict(t)``; raises if above ``atol``."""
+    import torch
+
+    t = np.asarray(t, dtype=np.float32).reshape(-1, 1)
+    with torch.no_grad():
+        expected = model(torch.from_numpy(t)).numpy()
+    actual = runtime.predict(t)
+    error = float(np.max(np.abs(actual.reshape(expected.shape) - expected)))
+    if error > atol:
+        raise AssertionError(f"exported model differs from torch by {error:.3e} (atol {atol:.0e})")
+    return error
+
+
+# --- 2. Runtime (NumPy only) ---
+class MLPRuntime:
+    """Batched forward pass of an exported MLP.
+
+    ``predict`` takes ``(P,)`` or ``(P, in)`` points shared by every member, or
+    ``(members, P, in)`` points per member. It returns ``(members, P, out)``;
+    for a single member the leading axis is dropped, and for 1-D input to a
+    single-output model the result is ``(P,)``.
+    """
+
+    def __init__(self, weights, biases, activations, metadata=None, max_batch=4096):
+        self.weights = [np.ascontiguousarray(w) for w in weights]
+        self.dtype = self.weights[0].dtype
+        self.biases = [np.ascontiguousarray(b, dtype=self.dtype) for b in biases]
+        self.activations = [ACTIVATIONS[name] for name in activations]
+        self.activation_names = list(activations)
+        self.metadata = metadata or {}
+        self.n_members = self.weights[0].shape[0]
+        self.in_features = self.weights[0].shape[1]
+        self.out_features = self.weights[-1].shape[2]
+        self.max_batch = max_batch
+        # One set of buffers per thread (Streamlit runs every session in its own thread)
+        self._local = threading.local()
+
+    @classmethod
+    def load(cls, path, max_batch=4096):
+        with np.load(path) as f:
+            n_layers = len(f["activations"])
+            weights = [f[f"W{i}"] for i in range(n_layers)]
+            biases = [f[f"b{i}"] for i in range(n_layers)]
+            return cls(weights, biases, [str(a) for a in f["activations"]], json.loads(str(f["metadata"])),
+                       max_batch=max_batch)
+
+    def _buffers(self):
+        buffers = getattr(self._local, "buffers", None)
+        if buffers is None:
+            buffers = [np.empty((self.n_members, self.max_batch, w.shape[2]), dtype=self.dtype) for w in self.weights]
+            self._local.buffers = buffers
+        return buffers
+
+    def predict(self, x, out=None):
+        """Evaluate at ``x``; ``out`` (a C-contiguous array of the model dtype with
+        ``members * P * out`` elements) receives the result in place, and the return value is a view of it."""
+        # Contiguous up front, so the reshapes below are views and never hidden copies
+        x = np.ascontiguousarray(x, dtype=self.dtype)
+        flat = x.ndim == 1
+        if flat:
+            x = x.reshape(-1, 1)
+        per_member = x.ndim == 3
+        n_points = x.shape[-2]
+        shape = (self.n_members, n_points, self.out_features)
+        if out is None:
+            result = np.empty(shape, self.dtype)
+        elif not out.flags.c_contiguous or out.dtype != self.dtype or out.size != np.prod(shape):
+            raise ValueError(f"out must be a C-contiguous {self.dtype} array with {int(np.prod(shape))} elements")
+        else:
+            result = out.reshape(shape)
+        buffers = self._buffers()
+        for start in range(0, n_points, self.max_batch):
+            stop = min(start + self.max_batch, n_points)
+            h = x[:, start:stop] if per_member else x[start:stop]
+            for w, b, activation, buffer in zip(self.weights, self.biases, self.activations, buffers):
+                buffer = buffer[:, :stop - start]
+                np.matmul(h, w, out=buffer)
+                buffer += b
+                h = activation(buffer)
+            result[:, start:stop] = h
+        if self.n_members == 1 and not per_member:
+            result = result[0]
+            if flat and self.out_features == 1:
+                result = result[:, 0]
+        return result
+
+
+def load_runtime(path, max_batch=4096):
+    return MLPRuntime.load(path, max_batch=max_batch)
+
+
+# --- 3. Benchmark ---
+def _time(fn, repeat=5):
+    fn()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return sorted(times)[len(times) // 2]
+
+
+def benchmark(path, n_points=1_000_000, n_assets=1000, points_per_asset=300):
+    """Time the runtime (and torch, if installed) on one long batch and on a stacked fleet of assets."""
+    runtime = load_runtime(path)
+    t = np.linspace(0.0, 10.0, n_points, dtype=np.float32)
+    out = np.empty(n_points, dtype=np.float32)
+    print(f"{path}: {runtime.n_members} member(s), layers {[w.shape[1:] for w in runtime.weights]}, "
+          f"metadata {runtime.metadata}")
+    print(f"numpy runtime, {n_points:,} points: {_time(lambda: runtime.predict(t, out=out)) * 1000:.1f} ms")
+
+    fleet = MLPRuntime([np.repeat(w, n_assets, axis=0) for w in runtime.weights],
+                       [np.repeat(b, n_assets, axis=0) for b in runtime.biases], runtime.activation_names,
+                       max_batch=points_per_asset)
+    t_assets = np.random.default_rng(0).uniform(0.0, 10.0, (n_assets, points_per_asset, 1)).astype(np.float32)
+    print(f"numpy runtime, {n_assets} assets x {points_per_asset} points: "
+          f"{_time(lambda: fleet.predict(t_assets)) * 1000:.1f} ms")
+
+    try:
+        start = time.perf_counter()
+        import torch
+    except ImportError:
+        return
+    print(f"import torch: {time.perf_counter() - start:.2f} s")
+    model = to_torch(runtime)
+    t_torch = torch.from_numpy(t).view(-1, 1)
+    with torch.no_grad():
+        print(f"torch, {n_points:,} points: {_time(lambda: model(t_torch)) * 1000:.1f} ms")
+    print(f"max |numpy - torch| on [0, 10]: {check_against_torch(model, runtime, t[::100]):.2e}")
+
+
+def to_torch(runtime, member=0):
+    """Rebuild member ``member`` of an exported model as an ``nn.Sequential`` (for checks)."""
+    import torch
+    import torch.nn as nn
+
+    layers = []
+    for w, b, name in zip(runtime.weights, runtime.biases, runtime.activation_names):
+        linear = nn.Linear(w.shape[1], w.shape[2])
+        with torch.no_grad():
+            linear.weight.copy_(torch.from_numpy(np.ascontiguousarray(w[member].T)))
+            linear.bias.copy_(torch.from_numpy(b[member, 0]))
+        layers.append(linear)
+        if name == "tanh":
+            layers.append(nn.Tanh())
+    return nn.Sequential(*layers)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("path", nargs="?", default="models/pinn_soft_sensor.npz")
+    parser.add_argument("--points", type=int, default=1_000_000)
+    args = parser.parse_args(argv)
+    benchmark(args.path, n_points=args.points)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Content-addressed on-disk cache of trained models and their predictions.
+
+Each entry is keyed by a hash of the full configuration that produced it
+(problem constants, seed, architecture, training schedule, and through
+``code_fingerprint`` the torch version and the training code), so a re-run with
+an unchanged configuration skips training, and changing a setting that only
+affects one model retrains only that model. An entry is a directory holding:
+
+* ``model.pt``: the ``state_dict``
+* ``arrays.npz``: the loss history and the predictions on ``t_test``
+* ``config.json``: the configuration, for inspection
+
+Entries are evicted least-recently-used first once the cache directory grows
+past ``max_bytes``.
+"""
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import torch
+
+CACHE_DIR = ".pinn_cache"
+DEFAULT_MAX_BYTES = 100 * 1024 * 1024
+
+
+def config_key(config):
+    """Stable hash of a JSON-serialisable configuration dict."""
+    payload = json.dumps(config, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:20]
+
+
+def code_fingerprint(*code):
+    """``{"torch", "code"}`` entries for a configuration: the torch version and a hash of the
+    source of ``code`` (functions, classes or modules), so editing the training code misses the cache."""
+    digest = hashlib.sha256()
+    for obj in code:
+        digest.update(inspect.getsource(obj).encode("utf-8"))
+    return {"torch": torch.__version__, "code": digest.hexdigest()[:20]}
+
+
+class ModelCache:
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _entry(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def load(self, key):
+        """Return ``{"state_dict", "loss_history", "predictions", "config"}`` or None on a miss."""
+        entry = self._entry(key)
+        try:
+            state_dict = torch.load(os.path.join(entry, "model.pt"), weights_only=True)
+            with np.load(os.path.join(entry, "arrays.npz")) as arrays:
+                loss_history = arrays["loss_history"]
+                predictions = arrays["predictions"]
+            with open(os.path.join(entry, "config.json"), encoding="utf-8") as f:
+                config = json.load(f)
+        except (FileNotFoundError, OSError, ValueError, KeyError, RuntimeError):
+            return None
+        # Mark as recently used for eviction
+        os.utime(entry)
+        return {"state_dict": state_dict, "loss_history": loss_history,
+                "predictions": predictions, "config": config}
+
+    def save(self, key, config, state_dict, loss_history, predictions):
+        """Write an entry atomically, then evict old entries if over budget."""
+        tmp = tempfile.mkdtemp(prefix=f".{key}-", dir=self.cache_dir)
+        try:
+            torch.save(state_dict, os.path.join(tmp, "model.pt"))
+            np.savez_compressed(os.path.join(tmp, "arrays.npz"),
+                                loss_history=np.asarray(loss_history, dtype=np.float64),
+                                predictions=np.asarray(predictions))
+            with open(os.path.join(tmp, "config.json"), "w", encoding="utf-8") as f:
+                json.dump(config, f, indent=2, sort_keys=True, default=str)
+            entry = self._entry(key)
+            if os.path.isdir(entry):
+                shutil.rmtree(entry)
+            os.replace(tmp, entry)
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        self.evict(keep=key)
+
+    def entries(self):
+        """``(key, size_bytes, last_used)`` for every complete entry, oldest first."""
+        result = []
+        for name in os.listdir(self.cache_dir):
+            path = self._entry(name)
+            if name.startswith(".") or not os.path.isdir(path):
+                continue
+            size = sum(e.stat().st_size for e in os.scandir(path) if e.is_file())
+            result.append((name, size, os.stat(path).st_mtime))
+        return sorted(result, key=lambda e: e[2])
+
+    def size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self, keep=None):
+        """Remove least-recently-used entries until the cache fits in ``max_bytes``."""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        removed = []
+        for key, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            shutil.rmtree(self._entry(key), ignore_errors=True)
+            total -= size
+            removed.append(key)
+        return removed
+
+    def clear(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        os.makedirs(self.cache_dir, exist_ok=True)
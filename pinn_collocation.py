@@ -0,0 +1,171 @@
+"""Residual-based adaptive collocation sampling for the PINN.
+
+``pinn_vs_nn.py`` enforces the physics on a fixed ``torch.linspace`` grid, so
+points are spent evenly even where ``dA/dt + k*A`` is already near zero. The
+``AdaptiveCollocation`` sampler starts from a small uniform set and every
+``resample_every`` epochs evaluates the residual on a dense candidate pool:
+
+* ``mode="add"`` appends the candidates with the largest residual until the
+  point budget is used up (residual-based adaptive refinement).
+* ``mode="resample"`` redraws the whole set, with probability proportional to
+  the squared residual mixed with a uniform share.
+
+With ``batch_size`` set, each step uses a random mini-batch of the current set
+instead of all of it. ``cost_report()`` gives the per-step cost.
+
+On this 1-D decay problem the residual is small everywhere, and 20 adaptive
+points do not beat a 20- or 100-point uniform grid on the extrapolation error
+(all land near 0.01 RMSE after 10k epochs); the sampler is meant for problems
+whose residual is concentrated in a few regions.
+
+Usage (compares uniform and adaptive points on the extrapolation error):
+    python pinn_collocation.py
+"""
+import time
+
+import torch
+
+from pinn_residual import physics_residual
+
+
+# --- 1. Sampler ---
+class AdaptiveCollocation:
+    def __init__(self, t_min, t_max, budget=40, n_initial=10, pool_size=2000, resample_every=500,
+                 n_add=5, mode="add", uniform_fraction=0.2, batch_size=None, seed=0):
+        if mode not in ("add", "resample"):
+            raise ValueError(f"Unknown sampling mode: {mode!r}")
+        self.budget = budget
+        self.resample_every = resample_every
+        self.n_add = n_add
+        self.mode = mode
+        self.uniform_fraction = uniform_fraction
+        self.batch_size = batch_size
+        self.generator = torch.Generator().manual_seed(seed)
+        self.pool = torch.linspace(t_min, t_max, pool_size).view(-1, 1)
+        # The point set is always a subset of the pool, tracked by index
+        self.indices = torch.linspace(0, pool_size - 1, min(n_initial, budget)).round().long().unique()
+        self.taken = torch.zeros(pool_size, dtype=torch.bool)
+        self.taken[self.indices] = True
+        self.update_time = 0.0
+        self.n_updates = 0
+        self.points_used = 0
+        self.n_steps = 0
+
+    @property
+    def points(self):
+        return self.pool[self.indices]
+
+    def pool_residual(self, model, k):
+        """Absolute residual on the candidate pool (no graph is built, hence the tangent engine)."""
+        with torch.no_grad():
+            _, residual = physics_residual(model, self.pool, k, engine="tangent")
+        return residual.abs().squeeze(-1)
+
+    def maybe_update(self, model, epoch, k):
+        """Refine the point set every ``resample_every`` epochs; return True if it changed."""
+        if epoch == 0 or epoch % self.resample_every != 0:
+            return False
+        if self.mode == "add" and len(self.points) >= self.budget:
+            return False
+        start = time.perf_counter()
+        residual = self.pool_residual(model, k)
+        if self.mode == "add":
+            # Skip candidates that are already in the set
+            residual = residual.masked_fill(self.taken, -1.0)
+            n_new = min(self.n_add, self.budget - len(self.indices), int((~self.taken).sum()))
+            new = torch.topk(residual, n_new).indices
+            self.indices = torch.cat([self.indices, new])
+        else:
+            weights = residual**2
+            total = weights.sum()
+            if torch.isfinite(total) and total > 0:
+                weights = (1 - self.uniform_fraction) * weights / total + self.uniform_fraction / len(weights)
+            else:
+                # Zero residual everywhere (or an overflow): nothing to prefer, draw uniformly
+                weights = torch.ones_like(weights)
+            self.indices = torch.multinomial(weights, min(self.budget, len(weights)), replacement=False,
+                                             generator=self.generator)
+            self.taken.zero_()
+        self.taken[self.indices] = True
+        self.update_time += time.perf_counter() - start
+        self.n_updates += 1
+        return True
+
+    def batch(self):
+        """Collocation points for one training step (a mini-batch if ``batch_size`` is set)."""
+        points = self.points
+        if self.batch_size is not None and self.batch_size < len(points):
+            idx = torch.randperm(len(points), generator=self.generator)[:self.batch_size]
+            points = points[idx]
+        self.points_used += len(points)
+        self.n_steps += 1
+        return points
+
+    def cost_report(self, train_time=None):
+        report = {
+            "steps": self.n_steps,
+            "final_points": len(self.points),
+            "mean_points_per_step": self.points_used / max(self.n_steps, 1),
+            "updates": self.n_updates,
+            "update_time_s": self.update_time,
+        }
+        if train_time is not None:
+            report["time_per_step_ms"] = 1e3 * train_time / max(self.n_steps, 1)
+        return report
+
+
+# --- 2. Training Loop ---
+def train_pinn_adaptive(model, sampler, t_train, A_train, k, epochs=20000, lr=1e-3, log_every=4000):
+    """Adam PINN loop drawing its collocation points from ``sampler``; returns wall time."""
+    optimizer = torch.optim.Adam(model.parameters(), lr=lr)
+    start = time.perf_counter()
+    for epoch in range(epochs):
+        sampler.maybe_update(model, epoch, k)
+        optimizer.zero_grad()
+        loss_data = torch.mean((model(t_train) - A_train) ** 2)
+        _, residual = physics_residual(model, sampler.batch(), k)
+        loss_physics = torch.mean(residual**2)
+        loss = loss_data + loss_physics
+        loss.backward()
+        optimizer.step()
+        if log_every and (epoch + 1) % log_every == 0:
+            print(f'PINN Epoch [{epoch+1}/{epochs}], Loss: {loss.item():.6f} '
+                  f'(Data: {loss_data.item():.6f}, Physics: {loss_physics.item():.6f}, Points: {len(sampler.points)})')
+    return time.perf_counter() - start
+
+
+class UniformCollocation(AdaptiveCollocation):
+    """Fixed ``linspace`` grid with the sampler interface, for comparison."""
+
+    def __init__(self, t_min, t_max, n_points, batch_size=None, seed=0):
+        super().__init__(t_min, t_max, budget=n_points, n_initial=n_points, pool_size=n_points,
+                         batch_size=batch_size, seed=seed)
+
+    def maybe_update(self, model, epoch, k):
+        return False
+
+
+if __name__ == "__main__":
+    from pinn_vs_nn import A0, A_train, create_network, k, t_max, t_max_train, t_min, t_test, t_train
+
+    epochs = 10000
+    mask = t_test.squeeze(-1) > t_max_train
+
+    samplers = {
+        "uniform-100": UniformCollocation(t_min, t_max, 100),
+        "uniform-20": UniformCollocation(t_min, t_max, 20),
+        "adaptive-add-20": AdaptiveCollocation(t_min, t_max, budget=20, n_initial=8, resample_every=500, n_add=2),
+        "adaptive-resample-20": AdaptiveCollocation(t_min, t_max, budget=20, n_initial=20, resample_every=500,
+                                                    mode="resample"),
+    }
+    for name, sampler in samplers.items():
+        torch.manual_seed(42)
+        model = create_network()
+        train_time = train_pinn_adaptive(model, sampler, t_train, A_train, k, epochs=epochs, log_every=0)
+        with torch.no_grad():
+            pred = model(t_test[mask])
+        rmse = torch.sqrt(torch.mean((pred - A0 * torch.exp(-k * t_test[mask])) ** 2)).item()
+        cost = sampler.cost_report(train_time)
+        print(f"{name:>22}: extrapolation RMSE {rmse:.5f}, {cost['final_points']} points, "
+              f"{cost['mean_points_per_step']:.1f} points/step, {cost['time_per_step_ms']:.3f} ms/step, "
+              f"{cost['updates']} updates ({cost['update_time_s'] * 1e3:.1f} ms)")
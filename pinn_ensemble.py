@@ -0,0 +1,222 @@
+"""Vectorized ensemble training for the NN vs. PINN comparison.
+
+Trains N replicas of the 1-20-20-20-1 tanh network from ``pinn_vs_nn.py`` in
+one batched pass: the weights of every replica are stacked along a leading
+ensemble dimension and each layer becomes a single ``torch.baddbmm`` call.
+Replicas can differ in seed, rate constant ``k`` and noise draw of the training
+data, which gives confidence bands for both models at the cost of one run.
+
+Usage:
+    python pinn_ensemble.py
+"""
+import time
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from pinn_vs_nn import A0, create_network, make_training_data, n_physics_points, t_max, t_max_train, t_min
+
+
+# --- 1. Stacked Network ---
+class EnsembleMLP(nn.Module):
+    """N copies of an ``nn.Sequential`` of Linear/Tanh layers with stacked weights.
+
+    Weights have shape ``(N, in, out)`` and biases ``(N, 1, out)``. Inputs are
+    ``(N, P, 1)`` (one set of points per replica) or ``(P, 1)`` (shared points).
+    """
+
+    def __init__(self, networks):
+        super().__init__()
+        linears = [[m for m in net if isinstance(m, nn.Linear)] for net in networks]
+        self.n_members = len(networks)
+        self.weights = nn.ParameterList()
+        self.biases = nn.ParameterList()
+        for layer in zip(*linears):
+            self.weights.append(nn.Parameter(torch.stack([l.weight.detach().t() for l in layer])))
+            self.biases.append(nn.Parameter(torch.stack([l.bias.detach().unsqueeze(0) for l in layer])))
+
+    @classmethod
+    def from_seeds(cls, seeds):
+        """Initialise replica i exactly like ``create_network()`` after ``torch.manual_seed(seeds[i])``.
+
+        The seeding happens on a forked RNG, so the caller's global RNG state is left untouched.
+        """
+        networks = []
+        for seed in seeds:
+            with torch.random.fork_rng():
+                torch.manual_seed(seed)
+                networks.append(create_network())
+        return cls(networks)
+
+    def _expand(self, t):
+        if t.dim() == 2:
+            t = t.unsqueeze(0).expand(self.n_members, -1, -1)
+        return t
+
+    def forward(self, t):
+        h = self._expand(t)
+        last = len(self.weights) - 1
+        for i, (w, b) in enumerate(zip(self.weights, self.biases)):
+            h = torch.baddbmm(b, h, w)
+            if i < last:
+                h = torch.tanh(h)
+        return h
+
+    def forward_with_derivative(self, t, dt=None):
+        """Return ``(A, dA/dt)`` in one sweep (see the tangent engine in ``pinn_residual.py``).
+
+        ``dt`` is the derivative of the input with respect to time: ones for raw
+        time, or the tangent of features computed by earlier layers.
+        """
+        h = self._expand(t)
+        dh = torch.ones_like(h) if dt is None else self._expand(dt)
+        last = len(self.weights) - 1
+        for i, (w, b) in enumerate(zip(self.weights, self.biases)):
+            h = torch.baddbmm(b, h, w)
+            dh = torch.bmm(dh, w)
+            if i < last:
+                h = torch.tanh(h)
+                dh = (1 - h * h) * dh
+        return h, dh
+
+    def member(self, i):
+        """Return replica ``i`` as a standalone ``nn.Sequential`` of Linear/Tanh layers.
+
+        Layer sizes come from the stacked weights, so any width, depth or number of outputs works.
+        """
+        layers = []
+        last = len(self.weights) - 1
+        with torch.no_grad():
+            for j, (w, b) in enumerate(zip(self.weights, self.biases)):
+                lin = nn.Linear(w.shape[1], w.shape[2])
+                lin.weight.copy_(w[i].t())
+                lin.bias.copy_(b[i, 0])
+                layers += [lin, nn.Tanh()] if j < last else [lin]
+        return nn.Sequential(*layers)
+
+
+# --- 2. Per-replica Data ---
+def make_ensemble_data(seeds, ks=0.5, noise=0.03):
+    """Build training data for each replica.
+
+    ``ks`` is a scalar or one rate constant per replica; replica i draws its
+    noise from ``np.random.RandomState(seeds[i])``, so seed 42 reproduces the
+    training set of ``pinn_vs_nn.py``.
+    Returns ``t_train (P, 1)``, ``A_train (N, P, 1)`` and ``k (N, 1, 1)``.
+    """
+    n = len(seeds)
+    ks = np.broadcast_to(np.asarray(ks, dtype=float), (n,))
+    A_train_np = []
+    for seed, k_i in zip(seeds, ks):
+        t_train_np, A_i = make_training_data(noise_std=noise, k=k_i, seed=seed)
+        A_train_np.append(A_i)
+    A_train_np = np.stack(A_train_np)
+    t_train = torch.tensor(t_train_np).float().view(-1, 1)
+    A_train = torch.tensor(A_train_np).float().unsqueeze(-1)
+    k = torch.tensor(ks).float().view(n, 1, 1)
+    return t_train, A_train, k
+
+
+def member_mse(pred, target):
+    """Mean squared error per replica, shape ``(N,)``."""
+    return ((pred - target) ** 2).mean(dim=(1, 2))
+
+
+# --- 3. Batched Training Loops ---
+# Adam is element-wise, so one optimizer over the stacked parameters with the
+# summed per-replica losses is equivalent to N independent optimizers.
+def train_ensemble_nn(model, t_train, A_train, epochs=20000, lr=1e-3, log_every=4000):
+    optimizer = torch.optim.Adam(model.parameters(), lr=lr)
+    for epoch in range(epochs):
+        optimizer.zero_grad()
+        loss = member_mse(model(t_train), A_train)
+        loss.sum().backward()
+        optimizer.step()
+        if log_every and (epoch + 1) % log_every == 0:
+            print(f'NN Ensemble Epoch [{epoch+1}/{epochs}], Loss mean: {loss.mean().item():.6f}, max: {loss.max().item():.6f}')
+    return loss.detach()
+
+
+def ensemble_physics_residual(model, t_physics, k, engine="reverse"):
+    """Residual ``dA/dt + k*A`` for every replica at every collocation point.
+
+    ``engine`` is ``"reverse"`` (``autograd.grad``) or ``"tangent"``
+    (derivative carried through the forward pass); both train at the same speed.
+    """
+    if engine == "tangent":
+        A, dA_dt = model.forward_with_derivative(t_physics.detach())
+    elif engine == "reverse":
+        # Each replica gets its own leaf so the input gradient is not summed across replicas
+        t = t_physics.detach().unsqueeze(0).expand(model.n_members, -1, -1).clone().requires_grad_(True)
+        A = model(t)
+        dA_dt = torch.autograd.grad(A, t, grad_outputs=torch.ones_like(A), create_graph=True)[0]
+    else:
+        raise ValueError(f"Unknown residual engine: {engine!r}")
+    return dA_dt + k * A
+
+
+def train_ensemble_pinn(model, t_train, A_train, t_physics, k, epochs=20000, lr=1e-3, log_every=4000,
+                        engine="reverse"):
+    optimizer = torch.optim.Adam(model.parameters(), lr=lr)
+    for epoch in range(epochs):
+        optimizer.zero_grad()
+        loss_data = member_mse(model(t_train), A_train)
+        loss_physics = (ensemble_physics_residual(model, t_physics, k, engine) ** 2).mean(dim=(1, 2))
+        loss = loss_data + loss_physics
+        loss.sum().backward()
+        optimizer.step()
+        if log_every and (epoch + 1) % log_every == 0:
+            print(f'PINN Ensemble Epoch [{epoch+1}/{epochs}], Loss mean: {loss.mean().item():.6f} '
+                  f'(Data: {loss_data.mean().item():.6f}, Physics: {loss_physics.mean().item():.6f})')
+    return loss.detach()
+
+
+# --- 4. Confidence Bands ---
+def prediction_band(model, t_test, quantiles=(0.05, 0.5, 0.95)):
+    """Quantiles of the replica predictions at ``t_test``, shape ``(len(quantiles), P)``."""
+    with torch.no_grad():
+        pred = model(t_test).squeeze(-1)
+    q = torch.tensor(quantiles, dtype=pred.dtype)
+    return torch.quantile(pred, q, dim=0).numpy()
+
+
+def extrapolation_rmse(model, t_test, k):
+    """RMSE per replica against its own analytical solution for ``t > t_max_train``."""
+    mask = t_test.squeeze(-1) > t_max_train
+    t_ext = t_test[mask]
+    with torch.no_grad():
+        pred = model(t_ext)
+    truth = A0 * torch.exp(-k * t_ext.unsqueeze(0))
+    return member_mse(pred, truth).sqrt().numpy()
+
+
+if __name__ == "__main__":
+    n_members = 32
+    epochs = 20000
+    seeds = list(range(42, 42 + n_members))
+
+    print(f"Training an ensemble of {n_members} NN and {n_members} PINN replicas in one batched pass.")
+    t_train, A_train, k = make_ensemble_data(seeds, ks=0.5, noise=0.03)
+    t_physics = torch.linspace(t_min, t_max, n_physics_points).view(-1, 1)
+    t_test = torch.linspace(t_min, t_max, 300).view(-1, 1)
+
+    print("\n--- Training the NN ensemble ---")
+    nn_ensemble = EnsembleMLP.from_seeds(seeds)
+    start = time.perf_counter()
+    train_ensemble_nn(nn_ensemble, t_train, A_train, epochs=epochs)
+    nn_time = time.perf_counter() - start
+
+    print("\n--- Training the PINN ensemble ---")
+    pinn_ensemble = EnsembleMLP.from_seeds(seeds)
+    start = time.perf_counter()
+    train_ensemble_pinn(pinn_ensemble, t_train, A_train, t_physics, k, epochs=epochs)
+    pinn_time = time.perf_counter() - start
+
+    for name, model, elapsed in (("NN", nn_ensemble, nn_time), ("PINN", pinn_ensemble, pinn_time)):
+        rmse = extrapolation_rmse(model, t_test, k)
+        band = prediction_band(model, t_test)
+        width = band[-1] - band[0]
+        print(f"\n{name}: {n_members * epochs / elapsed:.0f} replica-epochs/s ({elapsed:.1f}s total)")
+        print(f"{name}: extrapolation RMSE {rmse.mean():.4f} +/- {rmse.std():.4f}, "
+              f"mean 90% band width for t > {t_max_train}: {width[t_test.squeeze(-1).numpy() > t_max_train].mean():.4f}")
@@ -0,0 +1,145 @@
+"""Fast renderer for the NN vs. PINN extrapolation animation.
+
+``FuncAnimation(..., blit=False)`` redraws both subplots (titles, legends,
+grids, ground truth, training points) for every frame, and the Pillow writer
+rasterises the whole figure again. ``FrameRenderer`` draws that static
+background once on an Agg canvas, caches it with ``copy_from_bbox`` and, per
+frame, only restores the background and draws the growing prediction lines
+(and the legends, which sit on top of them) straight into a NumPy buffer.
+Frames can be split across worker processes, each with its own canvas.
+
+Usage:
+    render_gif("pinn_vs_nn_extrapolation.gif", scene, workers=4)
+"""
+import multiprocessing
+import time
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from PIL import Image
+
+FIGSIZE = (16, 7)
+
+
+# --- 1. Figure Layout (shared with the FuncAnimation path) ---
+def setup_axes(fig, ax1, ax2, scene):
+    """Draw the static parts of both panels; return the empty ``(line_nn, line_pinn)``.
+
+    ``scene`` holds ``t_test``, ``A_real``, ``t_train``, ``A_train`` and ``t_max_train``.
+    """
+    t_test, A_real = scene["t_test"], scene["A_real"]
+    t_lim = (float(np.min(t_test)), float(np.max(t_test)))
+    fig.suptitle("Extrapolation Test: Standard NN vs. PINN", fontsize=18)
+
+    # Plot 1 Setup: Standard NN
+    ax1.set_title("1. NN: Fails catastrophically to extrapolate", fontsize=14)
+    ax1.set_xlabel("Time (s)", fontsize=12)
+    ax1.set_ylabel("Concentration [A]", fontsize=12)
+    ax1.set_xlim(*t_lim)
+    ax1.set_ylim(-0.2, 1.2) # Fixed y-limit to see the NN's failure
+    ax1.plot(t_test, A_real, color='lightgray', linestyle='--', label='Real Process', lw=2)
+    ax1.plot(scene["t_train"], scene["A_train"], 'o', color='k', markerfacecolor='none', markersize=8, label='Training Data')
+    line_nn, = ax1.plot([], [], color='steelblue', label='NN Prediction', lw=2.5)
+    # Add a vertical line to mark the extrapolation zone
+    ax1.axvline(scene["t_max_train"], color='r', linestyle='--', alpha=0.8, label='Extrapolation Start')
+    ax1.legend(loc='upper right')
+    ax1.grid(True, linestyle=':', alpha=0.6)
+
+    # Plot 2 Setup: PINN
+    ax2.set_title("2. PINN: Successfully extrapolates using physics", fontsize=14)
+    ax2.set_xlabel("Time (s)", fontsize=12)
+    ax2.set_xlim(*t_lim)
+    ax2.plot(t_test, A_real, color='lightgray', linestyle='--', label='Real Process', lw=2)
+    ax2.plot(scene["t_train"], scene["A_train"], 'o', color='k', markerfacecolor='none', markersize=8, label='Training Data')
+    line_pinn, = ax2.plot([], [], color='teal', label='PINN Prediction', lw=2.5)
+    # Add the vertical line
+    ax2.axvline(scene["t_max_train"], color='r', linestyle='--', alpha=0.8, label='Extrapolation Start')
+    ax2.legend(loc='upper right')
+    ax2.grid(True, linestyle=':', alpha=0.6)
+
+    fig.tight_layout(rect=[0, 0.03, 1, 0.95])
+    return line_nn, line_pinn
+
+
+def frame_index(frame, total_frames, n_points):
+    # Usando (frame + 1) para garantir que a animação chegue a 100% no final
+    return min(int(((frame + 1) / total_frames) * n_points), n_points)
+
+
+# --- 2. Blitting Renderer ---
+class FrameRenderer:
+    """Renders animation frames to RGBA arrays by compositing the lines over a cached background."""
+
+    def __init__(self, scene, dpi=100):
+        self.scene = scene
+        self.fig = Figure(figsize=FIGSIZE, dpi=dpi)
+        self.canvas = FigureCanvasAgg(self.fig)
+        self.axes = self.fig.subplots(1, 2, sharey=True)
+        self.lines = setup_axes(self.fig, *self.axes, scene)
+        self.legends = [ax.get_legend() for ax in self.axes]
+        for line in self.lines:
+            line.set_animated(True)
+        # Two cached backgrounds: with the legends, and without them for frames where
+        # a prediction line runs under a legend and the legend must be drawn on top
+        self.canvas.draw()
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+        for legend in self.legends:
+            legend.set_visible(False)
+        self.canvas.draw()
+        self.background_no_legend = self.canvas.copy_from_bbox(self.fig.bbox)
+        for legend in self.legends:
+            legend.set_visible(True)
+            legend.set_animated(True)
+        renderer = self.canvas.get_renderer()
+        self.legend_boxes = [legend.get_window_extent(renderer).padded(5) for legend in self.legends]
+
+    def render(self, frame, total_frames):
+        t, preds = self.scene["t_test"], (self.scene["A_pred_nn"], self.scene["A_pred_pinn"])
+        max_index = frame_index(frame, total_frames, len(t))
+        for line, pred in zip(self.lines, preds):
+            line.set_data(t[:max_index], pred[:max_index])
+        renderer = self.canvas.get_renderer()
+        overlaps = [max_index > 0 and line.get_window_extent(renderer).overlaps(box)
+                    for line, box in zip(self.lines, self.legend_boxes)]
+        self.canvas.restore_region(self.background_no_legend if any(overlaps) else self.background)
+        for ax, line, legend in zip(self.axes, self.lines, self.legends):
+            ax.draw_artist(line)
+            if any(overlaps):
+                ax.draw_artist(legend)
+        return np.array(self.canvas.buffer_rgba())
+
+
+def to_gif_frame(rgba):
+    # Same conversion the Pillow GIF writer applies to each RGBA frame
+    return Image.fromarray(rgba, "RGBA").convert("P", palette=Image.Palette.ADAPTIVE)
+
+
+def _render_chunk(args):
+    scene, frames, total_frames, dpi, as_gif = args
+    renderer = FrameRenderer(scene, dpi=dpi)
+    rendered = [renderer.render(frame, total_frames) for frame in frames]
+    return [to_gif_frame(rgba) for rgba in rendered] if as_gif else rendered
+
+
+def render_frames(scene, total_frames=150, workers=1, dpi=100, as_gif=False):
+    """Render every frame, splitting contiguous chunks of frames over ``workers`` processes.
+
+    Returns RGBA arrays, or palette ``PIL.Image`` frames when ``as_gif`` is set
+    (quantising in the workers keeps the data sent back small).
+    """
+    frames = list(range(total_frames))
+    if workers <= 1:
+        return _render_chunk((scene, frames, total_frames, dpi, as_gif))
+    chunks = [chunk.tolist() for chunk in np.array_split(frames, workers) if len(chunk)]
+    with multiprocessing.get_context("spawn").Pool(len(chunks)) as pool:
+        results = pool.map(_render_chunk, [(scene, chunk, total_frames, dpi, as_gif) for chunk in chunks])
+    return [frame for chunk in results for frame in chunk]
+
+
+def render_gif(path, scene, total_frames=150, fps=30, workers=1, dpi=100):
+    """Write the animation as a GIF; returns the render time in seconds."""
+    start = time.perf_counter()
+    frames = render_frames(scene, total_frames, workers=workers, dpi=dpi, as_gif=True)
+    frames[0].save(path, save_all=True, append_images=frames[1:], duration=int(1000 / fps), loop=0)
+    return time.perf_counter() - start
@@ -0,0 +1,117 @@
+"""Residual engines for the PINN physics loss ``dA/dt + k*A``.
+
+The input of the network is 1-D time, so dA/dt can be carried through the
+forward pass instead of being recovered with ``torch.autograd.grad(...,
+create_graph=True)``. Three interchangeable engines return ``(A, dA/dt)``:
+
+* ``"tangent"``: propagates the derivative layer by layer (Linear: ``W @ dh``,
+  Tanh: ``(1 - tanh^2) * dh``) in the same sweep that computes ``A``.
+* ``"jvp"``: forward-mode AD with ``torch.func.jvp``.
+* ``"reverse"``: the original double-backward path, the reference and the
+  default.
+
+On CPU at 50 to 10,000 collocation points, tangent and reverse train at the
+same speed within noise (reverse was ahead at the usual 100 points: about
+1.3 vs 1.7 ms/step) and jvp is slower. So reverse stays the default. The
+tangent engine is for graph-free evaluation (under ``torch.no_grad`` reverse
+needs a graph it cannot have), e.g. scoring candidate points in
+``pinn_collocation.py``. ``test_pinn_residual.py`` checks that the engines agree.
+
+Usage (checks that all engines give the same loss and gradients, then times them):
+    python pinn_residual.py
+"""
+import time
+
+import torch
+import torch.nn as nn
+
+
+# --- 1. Engines ---
+def value_and_derivative_tangent(model, t):
+    """Forward sweep of an ``nn.Sequential`` of Linear/Tanh layers carrying ``dh/dt``."""
+    h = t
+    dh = torch.ones_like(t)
+    for layer in model:
+        if isinstance(layer, nn.Linear):
+            h = layer(h)
+            dh = dh @ layer.weight.t()
+        elif isinstance(layer, nn.Tanh):
+            h = torch.tanh(h)
+            dh = (1 - h * h) * dh
+        else:
+            raise TypeError(f"Tangent engine does not support layer {type(layer).__name__}")
+    return h, dh
+
+
+def value_and_derivative_jvp(model, t):
+    return torch.func.jvp(model, (t,), (torch.ones_like(t),))
+
+
+def value_and_derivative_reverse(model, t):
+    t = t.detach().requires_grad_(True)
+    A = model(t)
+    dA_dt = torch.autograd.grad(A, t, grad_outputs=torch.ones_like(A), create_graph=True)[0]
+    return A, dA_dt
+
+
+ENGINES = {
+    "tangent": value_and_derivative_tangent,
+    "jvp": value_and_derivative_jvp,
+    "reverse": value_and_derivative_reverse,
+}
+
+
+def physics_residual(model, t_physics, k, engine="reverse"):
+    """Return ``(A, residual)`` at the collocation points using the chosen engine."""
+    A, dA_dt = ENGINES[engine](model, t_physics)
+    return A, dA_dt + k * A
+
+
+def physics_loss(model, t_physics, k, engine="reverse"):
+    _, residual = physics_residual(model, t_physics, k, engine)
+    return torch.mean(residual**2)
+
+
+# --- 2. Consistency Check and Timing ---
+def check_engines(model, t_physics, k, atol=1e-6):
+    """Assert that every engine gives the reference loss and parameter gradients."""
+    results = {}
+    for name in ENGINES:
+        model.zero_grad()
+        loss = physics_loss(model, t_physics, k, engine=name)
+        loss.backward()
+        grads = torch.cat([p.grad.flatten() for p in model.parameters()])
+        results[name] = (loss.detach(), grads)
+    ref_loss, ref_grads = results["reverse"]
+    for name, (loss, grads) in results.items():
+        assert torch.allclose(loss, ref_loss, atol=atol), f"{name} loss {loss.item()} != reverse {ref_loss.item()}"
+        assert torch.allclose(grads, ref_grads, atol=atol), f"{name} gradients differ from reverse"
+    model.zero_grad()
+    return {name: loss.item() for name, (loss, _) in results.items()}
+
+
+def time_engine(model, t_train, A_train, t_physics, k, engine, steps=500):
+    """Seconds per PINN training step (data + physics loss, backward, Adam)."""
+    optimizer = torch.optim.Adam(model.parameters(), lr=1e-3)
+    start = time.perf_counter()
+    for _ in range(steps):
+        optimizer.zero_grad()
+        loss_data = torch.mean((model(t_train) - A_train) ** 2)
+        loss = loss_data + physics_loss(model, t_physics, k, engine)
+        loss.backward()
+        optimizer.step()
+    return (time.perf_counter() - start) / steps
+
+
+if __name__ == "__main__":
+    from pinn_vs_nn import A_train, create_network, k, t_physics, t_train
+
+    torch.manual_seed(42)
+    model = create_network()
+    losses = check_engines(model, t_physics, k)
+    print("Physics loss per engine: " + ", ".join(f"{name}={loss:.8f}" for name, loss in losses.items()))
+
+    for name in ENGINES:
+        torch.manual_seed(42)
+        per_step = time_engine(create_network(), t_train, A_train, t_physics, k, name)
+        print(f"{name:>8}: {per_step * 1e3:.3f} ms/step")
@@ -0,0 +1,227 @@
+"""Convergence-driven training schedule for the NN and the PINN.
+
+Instead of a fixed number of Adam iterations, training runs in phases:
+
+1. Adam warm-up, stopped early once the loss plateaus.
+2. Full-batch ``torch.optim.LBFGS`` refinement, which suits this tiny problem
+   (one 1-20-20-20-1 network, a handful of data points).
+
+Stopping is decided by ``StoppingCriteria``: an absolute tolerance on the total
+loss and a patience window on the data and physics loss components. Every run
+returns a ``TrainingReport`` with the iteration at which the tolerance was first
+reached, so the driver can be compared against the fixed 20,000-epoch schedule.
+
+Usage (compares the fixed schedule with the phased one on the PINN):
+    python pinn_training.py
+"""
+import math
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+import torch
+
+from pinn_residual import physics_loss
+
+
+# --- 1. Loss Closures ---
+def nn_losses(t_train, A_train):
+    """Loss closure for the standard NN: ``model -> (loss_data, loss_physics)``."""
+    def losses(model):
+        loss_data = torch.mean((model(t_train) - A_train) ** 2)
+        return loss_data, torch.zeros((), dtype=loss_data.dtype)
+    return losses
+
+
+def pinn_losses(t_train, A_train, t_physics, k, engine="reverse"):
+    """Loss closure for the PINN: ``model -> (loss_data, loss_physics)``."""
+    def losses(model):
+        loss_data = torch.mean((model(t_train) - A_train) ** 2)
+        return loss_data, physics_loss(model, t_physics, k, engine)
+    return losses
+
+
+# --- 2. Stopping Criteria and Report ---
+@dataclass
+class StoppingCriteria:
+    """Tolerance- and patience-based stopping on the data and physics losses.
+
+    ``tol`` stops as soon as ``loss_data + loss_physics <= tol``. The plateau
+    rule stops when neither component has improved by a relative ``min_delta``
+    during the last ``patience`` iterations.
+    """
+    tol: Optional[float] = None
+    patience: int = 1000
+    min_delta: float = 1e-3
+
+    def __post_init__(self):
+        self.reset()
+
+    def reset(self):
+        self.best = [math.inf, math.inf]
+        self.best_iteration = 0
+
+    def should_stop(self, iteration, loss_data, loss_physics):
+        if self.tol is not None and loss_data + loss_physics <= self.tol:
+            return True
+        improved = False
+        for i, value in enumerate((loss_data, loss_physics)):
+            if value < self.best[i] * (1 - self.min_delta):
+                self.best[i] = value
+                improved = True
+        if improved:
+            self.best_iteration = iteration
+        return iteration - self.best_iteration >= self.patience
+
+
+@dataclass
+class TrainingReport:
+    iterations: int = 0
+    iterations_to_tolerance: Optional[int] = None
+    phase_iterations: dict = field(default_factory=dict)
+    loss_data: float = math.nan
+    loss_physics: float = math.nan
+    wall_time: float = 0.0
+    history: list = field(default_factory=list)  # (iteration, phase, loss_data, loss_physics)
+
+    @property
+    def loss(self):
+        return self.loss_data + self.loss_physics
+
+    def _record(self, phase, loss_data, loss_physics, tol):
+        self.loss_data, self.loss_physics = loss_data, loss_physics
+        self.history.append((self.iterations, phase, loss_data, loss_physics))
+        if tol is not None and self.iterations_to_tolerance is None and self.loss <= tol:
+            self.iterations_to_tolerance = self.iterations
+
+
+# --- 3. Phased Training Driver ---
+class _BudgetExhausted(Exception):
+    """Raised by the L-BFGS closure once ``lbfgs_iterations`` evaluations have been used."""
+
+
+def train_with_schedule(model, losses, adam_epochs=5000, adam_lr=1e-3, lbfgs_iterations=1000,
+                        stopping=None, check_every=50, log_every=0, label="Model"):
+    """Train ``model`` with Adam warm-up followed by L-BFGS refinement.
+
+    ``losses(model)`` returns ``(loss_data, loss_physics)``. Losses are only
+    synchronised with ``.item()`` every ``check_every`` iterations; one L-BFGS
+    function evaluation counts as one iteration, and ``lbfgs_iterations`` is
+    never exceeded. Pass ``lbfgs_iterations=0``
+    and ``stopping=None`` to reproduce the fixed Adam schedule.
+    """
+    report = TrainingReport()
+    tol = stopping.tol if stopping is not None else None
+    start = time.perf_counter()
+
+    # Phase 1: Adam warm-up
+    if stopping is not None:
+        stopping.reset()
+    optimizer = torch.optim.Adam(model.parameters(), lr=adam_lr)
+    for epoch in range(adam_epochs):
+        optimizer.zero_grad()
+        loss_data, loss_physics = losses(model)
+        (loss_data + loss_physics).backward()
+        optimizer.step()
+        report.iterations += 1
+        if (epoch + 1) % check_every == 0 or epoch + 1 == adam_epochs:
+            report._record("adam", loss_data.item(), loss_physics.item(), tol)
+            if log_every and (epoch + 1) % log_every == 0:
+                print(f'{label} Adam [{epoch+1}/{adam_epochs}], Loss: {report.loss:.6f} '
+                      f'(Data: {report.loss_data:.6f}, Physics: {report.loss_physics:.6f})')
+            if stopping is not None and stopping.should_stop(report.iterations, report.loss_data, report.loss_physics):
+                break
+    report.phase_iterations["adam"] = report.iterations
+    reached_tol = report.iterations_to_tolerance is not None
+
+    # Phase 2: full-batch L-BFGS refinement
+    if lbfgs_iterations and not reached_tol:
+        if stopping is not None:
+            stopping.reset()
+        optimizer = torch.optim.LBFGS(model.parameters(), lr=1.0, max_iter=20, history_size=50,
+                                      tolerance_grad=1e-9, tolerance_change=1e-12,
+                                      line_search_fn="strong_wolfe")
+        evaluations = 0
+        last = {}
+
+        def closure():
+            nonlocal evaluations
+            if evaluations >= lbfgs_iterations:
+                raise _BudgetExhausted
+            optimizer.zero_grad()
+            loss_data, loss_physics = losses(model)
+            loss = loss_data + loss_physics
+            loss.backward()
+            evaluations += 1
+            last["data"], last["physics"] = loss_data.detach(), loss_physics.detach()
+            return loss
+
+        while evaluations < lbfgs_iterations:
+            before = evaluations
+            # Keep each step inside the remaining evaluation budget. The strong Wolfe line search does
+            # not check max_eval, so the closure also refuses to run past it; the aborted step is undone.
+            remaining = lbfgs_iterations - evaluations
+            group = optimizer.param_groups[0]
+            group["max_iter"], group["max_eval"] = min(20, remaining), remaining
+            start_params = [p.detach().clone() for p in group["params"]]
+            try:
+                optimizer.step(closure)
+            except _BudgetExhausted:
+                with torch.no_grad():
+                    for p, saved in zip(group["params"], start_params):
+                        p.copy_(saved)
+                report.iterations += evaluations - before
+                break
+            report.iterations += evaluations - before
+            report._record("lbfgs", last["data"].item(), last["physics"].item(), tol)
+            if log_every:
+                print(f'{label} L-BFGS [{evaluations}/{lbfgs_iterations}], Loss: {report.loss:.6f} '
+                      f'(Data: {report.loss_data:.6f}, Physics: {report.loss_physics:.6f})')
+            if evaluations == before or not math.isfinite(report.loss):
+                break
+            if stopping is not None and stopping.should_stop(report.iterations, report.loss_data, report.loss_physics):
+                break
+        report.phase_iterations["lbfgs"] = report.iterations - report.phase_iterations["adam"]
+
+    report.wall_time = time.perf_counter() - start
+    return report
+
+
+def summarize(label, report):
+    to_tol = report.iterations_to_tolerance if report.iterations_to_tolerance is not None else "not reached"
+    phases = ", ".join(f"{name}={n}" for name, n in report.phase_iterations.items())
+    print(f"{label}: {report.iterations} iterations ({phases}) in {report.wall_time:.1f}s, "
+          f"final loss {report.loss:.6f}, iterations to tolerance: {to_tol}")
+
+
+if __name__ == "__main__":
+    from pinn_vs_nn import A0, A_train, create_network, k, t_max_train, t_physics, t_test, t_train
+
+    def extrapolation_rmse(model):
+        mask = t_test.squeeze(-1) > t_max_train
+        with torch.no_grad():
+            pred = model(t_test[mask])
+        return torch.sqrt(torch.mean((pred - A0 * torch.exp(-k * t_test[mask])) ** 2)).item()
+
+    losses = pinn_losses(t_train, A_train, t_physics, k)
+
+    print("--- Fixed schedule: 20000 Adam epochs ---")
+    torch.manual_seed(42)
+    fixed_model = create_network()
+    fixed = train_with_schedule(fixed_model, losses, adam_epochs=20000, lbfgs_iterations=0)
+    summarize("Fixed", fixed)
+
+    # Tolerance: reach the final loss of the fixed schedule (within 5%)
+    tol = fixed.loss * 1.05
+    fixed_to_tol = next(it for it, _, d, p in fixed.history if d + p <= tol)
+
+    print("\n--- Phased schedule: Adam warm-up + L-BFGS refinement ---")
+    torch.manual_seed(42)
+    phased_model = create_network()
+    phased = train_with_schedule(phased_model, losses, adam_epochs=20000, lbfgs_iterations=2000,
+                                 stopping=StoppingCriteria(tol=tol, patience=1000, min_delta=1e-2))
+    summarize("Phased", phased)
+
+    print(f"\nIterations to loss <= {tol:.6f}: fixed {fixed_to_tol}, phased {phased.iterations_to_tolerance}")
+    print(f"Extrapolation RMSE (t > {t_max_train}): fixed {extrapolation_rmse(fixed_model):.5f}, "
+          f"phased {extrapolation_rmse(phased_model):.5f}")
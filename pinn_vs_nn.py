@@ -1,150 +1,266 @@
+import os
+import time
+
 import torch
 import torch.nn as nn
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.animation import FuncAnimation
 
-print("Starting the NN vs. PINN comparison with restricted training data (extrapolation test).")
-print("This process may take a few minutes...")
+from animation_export import export_animation, load_gif_frames, print_report
+from mlp_runtime import check_against_torch, export_mlp, load_runtime
+from model_cache import ModelCache, code_fingerprint, config_key
+from pinn_render import FIGSIZE, frame_index, render_gif, setup_axes
+import pinn_residual
+from pinn_residual import physics_residual
+from telemetry import Telemetry
 
-# For reproducibility
-torch.manual_seed(42)
-np.random.seed(42)
+# For reproducibility (the global RNGs are seeded in __main__, so importing this module leaves them alone)
+seed = 42
 
 # --- 1. Problem Definition and Data Generation (ADJUSTED) ---
+_data_generation_start = time.perf_counter()
 k = 0.5  # Rate constant
 A0 = 1.0 # Initial concentration
 
 # Analytical solution (ground truth)
-def analytical_solution(t):
+def analytical_solution(t, k=k, A0=A0):
     return A0 * np.exp(-k * t)
 
 # Time domain
 t_min, t_max = 0.0, 10.0
 # KEY POINT: Training data only covers the first half of the time domain
-t_max_train = t_max / 2.0 
+t_max_train = t_max / 2.0
 
 # Training Data: only in the first half of the domain
 n_train_points = 8
-t_train_np = np.linspace(t_min, t_max_train, n_train_points)
-A_train_np = analytical_solution(t_train_np) + 0.03 * np.random.randn(n_train_points)
-A_train_np[0] = A0 
+noise_std = 0.03
+
+def make_training_data(n_train_points=n_train_points, t_max_train=t_max_train, noise_std=noise_std,
+                       k=k, A0=A0, seed=seed):
+    """Noisy samples of the analytical solution on [t_min, t_max_train]."""
+    rng = np.random.RandomState(seed)
+    t_train_np = np.linspace(t_min, t_max_train, n_train_points)
+    A_train_np = analytical_solution(t_train_np, k, A0) + noise_std * rng.randn(n_train_points)
+    A_train_np[0] = A0
+    return t_train_np, A_train_np
+
+t_train_np, A_train_np = make_training_data()
 
 t_train = torch.tensor(t_train_np).float().view(-1, 1)
 A_train = torch.tensor(A_train_np).float().view(-1, 1)
 
 # Collocation Points: cover the ENTIRE DOMAIN to enforce physics everywhere
 n_physics_points = 100
-t_physics = torch.linspace(t_min, t_max, n_physics_points).view(-1, 1).requires_grad_(True)
+t_physics = torch.linspace(t_min, t_max, n_physics_points).view(-1, 1)
 
 # Test Data: cover the ENTIRE DOMAIN to plot the final curve
 t_test = torch.linspace(t_min, t_max, 300).view(-1, 1)
+data_generation_seconds = time.perf_counter() - _data_generation_start
+
+
+# --- 2. Network Architectures ---
+def create_network(width=20, depth=3, n_outputs=1):
+    # Default: 1-20-20-20-1 with tanh activations (n_outputs > 1 for multi-species ODEs, see pinn_ode.py)
+    layers = [nn.Linear(1, width), nn.Tanh()]
+    for _ in range(depth - 1):
+        layers += [nn.Linear(width, width), nn.Tanh()]
+    layers.append(nn.Linear(width, n_outputs))
+    return nn.Sequential(*layers)
+
+
+# --- 3. Training the Standard Neural Network (NN) ---
+def train_nn(model, t_train, A_train, epochs=20000, lr=1e-3, log_every=4000, history_every=100, telemetry=None):
+    """Adam on the data loss only; returns the loss sampled every ``history_every`` epochs.
+
+    ``telemetry`` (see telemetry.py) samples the loss at its own stride without ``.item()`` calls.
+    """
+    optimizer = torch.optim.Adam(model.parameters(), lr=lr)
+    loss_fn = nn.MSELoss()
+    loss_history = []
+    run = telemetry.run("nn") if telemetry is not None else None
+    for epoch in range(epochs):
+        optimizer.zero_grad()
+        A_pred = model(t_train)
+        loss = loss_fn(A_pred, A_train)
+        loss.backward()
+        optimizer.step()
+        if run is not None:
+            run.step(epoch + 1, loss=loss)
+        if (epoch + 1) % history_every == 0:
+            loss_history.append(loss.item())
+        if log_every and (epoch + 1) % log_every == 0:
+            print(f'NN Epoch [{epoch+1}/{epochs}], Loss: {loss.item():.6f}')
+    if run is not None:
+        run.close()
+    return loss_history
 
 
-# --- 2. Network Architectures (unchanged) ---
-def create_network():
-    return nn.Sequential(
-        nn.Linear(1, 20), nn.Tanh(),
-        nn.Linear(20, 20), nn.Tanh(),
-        nn.Linear(20, 20), nn.Tanh(),
-        nn.Linear(20, 1)
-    )
-
-# --- 3. Training the Standard Neural Network (NN) (unchanged) ---
-print("\n--- Training the Standard Neural Network (NN) ---")
-nn_model = create_network()
-optimizer_nn = torch.optim.Adam(nn_model.parameters(), lr=1e-3)
-loss_fn_nn = nn.MSELoss()
-epochs = 20000 # Increased epochs to give the NN the best possible chance
-
-for epoch in range(epochs):
-    optimizer_nn.zero_grad()
-    A_pred = nn_model(t_train)
-    loss = loss_fn_nn(A_pred, A_train)
-    loss.backward()
-    optimizer_nn.step()
-    if (epoch + 1) % 4000 == 0:
-        print(f'NN Epoch [{epoch+1}/{epochs}], Loss: {loss.item():.6f}')
-
-# --- 4. Training the PINN (logic unchanged) ---
-print("\n--- Training the Physics-Informed Neural Network (PINN) ---")
-pinn_model = create_network()
-optimizer_pinn = torch.optim.Adam(pinn_model.parameters(), lr=1e-3)
-epochs_pinn = 20000
-
-for epoch in range(epochs_pinn):
-    optimizer_pinn.zero_grad()
-    A_pred_data = pinn_model(t_train)
-    loss_data = loss_fn_nn(A_pred_data, A_train)
-    A_pred_physics = pinn_model(t_physics)
-    dA_dt = torch.autograd.grad(A_pred_physics, t_physics, grad_outputs=torch.ones_like(A_pred_physics), create_graph=True)[0]
-    residual = dA_dt + k * A_pred_physics
-    loss_physics = torch.mean(residual**2)
-    loss = loss_data + loss_physics
-    loss.backward()
-    optimizer_pinn.step()
-    if (epoch + 1) % 4000 == 0:
-        print(f'PINN Epoch [{epoch+1}/{epochs_pinn}], Loss: {loss.item():.6f} (Data: {loss_data.item():.6f}, Physics: {loss_physics.item():.6f})')
-
-# --- 5. Generating Predictions for Animation (unchanged) ---
-nn_model.eval()
-pinn_model.eval()
-with torch.no_grad():
-    A_pred_nn = nn_model(t_test).numpy()
-    A_pred_pinn = pinn_model(t_test).numpy()
-
-t_test_np = t_test.numpy()
-A_real_np = analytical_solution(t_test_np)
+# --- 4. Training the PINN ---
+def train_pinn(model, t_train, A_train, t_physics, k=k, epochs=20000, lr=1e-3, engine="reverse",
+               log_every=4000, history_every=100, telemetry=None):
+    """Adam on data + physics loss; ``engine`` selects how dA/dt is computed (see pinn_residual.py)."""
+    optimizer = torch.optim.Adam(model.parameters(), lr=lr)
+    loss_fn = nn.MSELoss()
+    loss_history = []
+    run = telemetry.run("pinn") if telemetry is not None else None
+    for epoch in range(epochs):
+        optimizer.zero_grad()
+        A_pred_data = model(t_train)
+        loss_data = loss_fn(A_pred_data, A_train)
+        A_pred_physics, residual = physics_residual(model, t_physics, k, engine=engine)
+        loss_physics = torch.mean(residual**2)
+        loss = loss_data + loss_physics
+        loss.backward()
+        optimizer.step()
+        if run is not None:
+            run.step(epoch + 1, loss=loss, data=loss_data, physics=loss_physics)
+        if (epoch + 1) % history_every == 0:
+            loss_history.append(loss.item())
+        if log_every and (epoch + 1) % log_every == 0:
+            print(f'PINN Epoch [{epoch+1}/{epochs}], Loss: {loss.item():.6f} (Data: {loss_data.item():.6f}, Physics: {loss_physics.item():.6f})')
+    if run is not None:
+        run.close()
+    return loss_history
+
+
+# --- 5. Generating Predictions ---
+def predict(model, t):
+    model.eval()
+    with torch.no_grad():
+        return model(t).numpy()
+
+
+def extrapolation_rmse(A_pred, t_np, k=k, A0=A0, t_max_train=t_max_train):
+    """RMSE against the analytical solution for ``t > t_max_train``."""
+    mask = t_np.ravel() > t_max_train
+    error = np.ravel(A_pred)[mask] - analytical_solution(t_np.ravel()[mask], k, A0)
+    return float(np.sqrt(np.mean(error**2)))
+
 
 # --- 6. Creating the Animation (visuals adjusted) ---
-print("\n--- Generating the animation 'pinn_vs_nn_extrapolation.gif' ---")
-
-fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(16, 7), sharey=True)
-fig.suptitle("Extrapolation Test: Standard NN vs. PINN", fontsize=18)
-
-# Plot 1 Setup: Standard NN
-ax1.set_title("1. NN: Fails catastrophically to extrapolate", fontsize=14)
-ax1.set_xlabel("Time (s)", fontsize=12)
-ax1.set_ylabel("Concentration [A]", fontsize=12)
-ax1.set_xlim(t_min, t_max)
-ax1.set_ylim(-0.2, 1.2) # Fixed y-limit to see the NN's failure
-ax1.plot(t_test_np, A_real_np, color='lightgray', linestyle='--', label='Real Process', lw=2)
-ax1.plot(t_train_np, A_train_np, 'o', color='k', markerfacecolor='none', markersize=8, label='Training Data')
-line_nn, = ax1.plot([], [], color='steelblue', label='NN Prediction', lw=2.5)
-# Add a vertical line to mark the extrapolation zone
-ax1.axvline(t_max_train, color='r', linestyle='--', alpha=0.8, label='Extrapolation Start')
-ax1.legend(loc='upper right')
-ax1.grid(True, linestyle=':', alpha=0.6)
-
-# Plot 2 Setup: PINN
-ax2.set_title("2. PINN: Successfully extrapolates using physics", fontsize=14)
-ax2.set_xlabel("Time (s)", fontsize=12)
-ax2.set_xlim(t_min, t_max)
-ax2.plot(t_test_np, A_real_np, color='lightgray', linestyle='--', label='Real Process', lw=2)
-ax2.plot(t_train_np, A_train_np, 'o', color='k', markerfacecolor='none', markersize=8, label='Training Data')
-line_pinn, = ax2.plot([], [], color='teal', label='PINN Prediction', lw=2.5)
-# Add the vertical line
-ax2.axvline(t_max_train, color='r', linestyle='--', alpha=0.8, label='Extrapolation Start')
-ax2.legend(loc='upper right')
-ax2.grid(True, linestyle=':', alpha=0.6)
-
-plt.tight_layout(rect=[0, 0.03, 1, 0.95])
-
-total_frames = 150
-
-def update(frame):
-    # Usando (frame + 1) para garantir que a animação chegue a 100% no final
-    max_index = int(((frame + 1) / total_frames) * len(t_test_np))
-    
-    # Garante que max_index não exceda o limite do array
-    max_index = min(max_index, len(t_test_np))
-
-    line_nn.set_data(t_test_np[:max_index], A_pred_nn[:max_index])
-    line_pinn.set_data(t_test_np[:max_index], A_pred_pinn[:max_index])
-    return line_nn, line_pinn
-
-# A mudança crucial: blit=False torna a animação mais robusta
-ani = FuncAnimation(fig, update, frames=total_frames, interval=30, blit=False)
-ani.save('pinn_vs_nn_extrapolation.gif', writer='pillow', fps=30)
-
-print("\nAnimation 'pinn_vs_nn_extrapolation.gif' saved successfully!")
+def save_animation(t_test_np, A_real_np, A_pred_nn, A_pred_pinn, t_train_np=t_train_np, A_train_np=A_train_np,
+                   t_max_train=t_max_train, path='static/pinn_vs_nn_extrapolation.gif', total_frames=150,
+                   renderer="blit", workers=1):
+    """Write the animation GIF and return the time it took in seconds.
+
+    ``renderer="blit"`` draws the static background once and only composites the
+    prediction lines per frame (see pinn_render.py); ``"funcanimation"`` is the
+    original full-redraw path.
+    """
+    scene = {"t_test": t_test_np.ravel(), "A_real": np.ravel(A_real_np), "t_train": t_train_np,
+             "A_train": A_train_np, "t_max_train": t_max_train,
+             "A_pred_nn": np.ravel(A_pred_nn), "A_pred_pinn": np.ravel(A_pred_pinn)}
+    if renderer == "blit":
+        return render_gif(path, scene, total_frames=total_frames, fps=30, workers=workers)
+
+    start = time.perf_counter()
+    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=FIGSIZE, sharey=True)
+    line_nn, line_pinn = setup_axes(fig, ax1, ax2, scene)
+
+    def update(frame):
+        max_index = frame_index(frame, total_frames, len(t_test_np))
+        line_nn.set_data(t_test_np[:max_index], A_pred_nn[:max_index])
+        line_pinn.set_data(t_test_np[:max_index], A_pred_pinn[:max_index])
+        return line_nn, line_pinn
+
+    # A mudança crucial: blit=False torna a animação mais robusta
+    ani = FuncAnimation(fig, update, frames=total_frames, interval=30, blit=False)
+    ani.save(path, writer='pillow', fps=30)
+    plt.close(fig)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    print("Starting the NN vs. PINN comparison with restricted training data (extrapolation test).")
+    print("This process may take a few minutes...")
+    torch.manual_seed(seed)
+    np.random.seed(seed)
+
+    epochs = 20000 # Increased epochs to give the NN the best possible chance
+    epochs_pinn = 20000
+    # dA/dt engine: "reverse" (autograd.grad), "tangent" (carried through the forward pass) or "jvp";
+    # reverse is as fast as tangent here and faster at the default 100 collocation points
+    residual_engine = "reverse"
+
+    # Stage timings and loss components (every 100 epochs) go to telemetry/pinn_vs_nn-<timestamp>.jsonl, one file
+    # per run (see telemetry.py); the log is closed even if a stage fails.
+    # Set profile_run="pinn" to record 20 PINN steps with torch.profiler.
+    with Telemetry(stride=100, profile_run=None, seed=seed, epochs=epochs, epochs_pinn=epochs_pinn,
+                   residual_engine=residual_engine) as telemetry:
+        telemetry.record_stage("data_generation", data_generation_seconds)
+
+        # Trained models and predictions are cached by a hash of everything that produced them
+        cache = ModelCache()
+        with torch.random.fork_rng():  # keep the seeded initialisation of both networks unchanged
+            architecture = repr(create_network())
+        base_config = {
+            "seed": seed, "k": k, "A0": A0, "t_min": t_min, "t_max": t_max, "t_max_train": t_max_train,
+            "n_train_points": n_train_points, "noise_std": noise_std, "n_test_points": len(t_test),
+            "architecture": architecture, "lr": 1e-3,
+        }
+        # Each model is keyed on the code that produced it, so editing the PINN loss leaves the cached NN valid
+        shared_code = (create_network, predict)
+
+        print("\n--- Training the Standard Neural Network (NN) ---")
+        nn_model = create_network()
+        nn_config = {**base_config, "model": "nn", "epochs": epochs, **code_fingerprint(*shared_code, train_nn)}
+        nn_key = config_key(nn_config)
+        cached_nn = cache.load(nn_key)
+        if cached_nn is not None:
+            print(f"Loaded cached NN ({nn_key}), skipping training.")
+            nn_model.load_state_dict(cached_nn["state_dict"])
+            A_pred_nn = cached_nn["predictions"]
+        else:
+            with telemetry.stage("nn_training"):
+                loss_history_nn = train_nn(nn_model, t_train, A_train, epochs=epochs, telemetry=telemetry)
+            with telemetry.stage("nn_prediction"):
+                A_pred_nn = predict(nn_model, t_test)
+            cache.save(nn_key, nn_config, nn_model.state_dict(), loss_history_nn, A_pred_nn)
+
+        print("\n--- Training the Physics-Informed Neural Network (PINN) ---")
+        pinn_model = create_network()
+        pinn_config = {**base_config, "model": "pinn", "epochs": epochs_pinn,
+                       "n_physics_points": n_physics_points, "residual_engine": residual_engine,
+                       **code_fingerprint(*shared_code, train_pinn, pinn_residual)}
+        pinn_key = config_key(pinn_config)
+        cached_pinn = cache.load(pinn_key)
+        if cached_pinn is not None:
+            print(f"Loaded cached PINN ({pinn_key}), skipping training.")
+            pinn_model.load_state_dict(cached_pinn["state_dict"])
+            A_pred_pinn = cached_pinn["predictions"]
+        else:
+            with telemetry.stage("pinn_training"):
+                loss_history_pinn = train_pinn(pinn_model, t_train, A_train, t_physics, k, epochs=epochs_pinn,
+                                               engine=residual_engine, telemetry=telemetry)
+            with telemetry.stage("pinn_prediction"):
+                A_pred_pinn = predict(pinn_model, t_test)
+            cache.save(pinn_key, pinn_config, pinn_model.state_dict(), loss_history_pinn, A_pred_pinn)
+
+        # NumPy-only copy of the PINN for the web app, which serves it without importing torch
+        with telemetry.stage("export"):
+            os.makedirs("models", exist_ok=True)
+            export_path = export_mlp(pinn_model, "models/pinn_soft_sensor.npz", k=k, A0=A0, t_min=t_min,
+                                     t_max=t_max, t_max_train=t_max_train, cache_key=pinn_key)
+            export_error = check_against_torch(pinn_model, load_runtime(export_path), t_test.numpy())
+        print(f"\nExported the PINN to '{export_path}' (max difference from torch: {export_error:.1e}).")
+
+        t_test_np = t_test.numpy()
+        A_real_np = analytical_solution(t_test_np)
+
+        print("\n--- Generating the animation 'static/pinn_vs_nn_extrapolation.gif' ---")
+        # Frames are rendered in parallel on up to 4 worker processes
+        render_workers = min(4, os.cpu_count() or 1)
+        with telemetry.stage("animation_save"):
+            render_time = save_animation(t_test_np, A_real_np, A_pred_nn, A_pred_pinn, workers=render_workers)
+        print(f"\nAnimation 'static/pinn_vs_nn_extrapolation.gif' saved successfully in {render_time:.1f}s!")
+
+        # The site serves these compact copies (WebP, GIF fallback) instead of the full GIF, see site_media.py
+        print("\n--- Exporting compact copies of the animation (400 kB budget each) ---")
+        with telemetry.stage("animation_export"):
+            frames, duration = load_gif_frames("static/pinn_vs_nn_extrapolation.gif")
+            report = export_animation(frames, "static/pinn_vs_nn_extrapolation.optimized", duration,
+                                      formats=("webp", "gif"), target_bytes=400 * 1024)
+        print_report(report, os.path.getsize("static/pinn_vs_nn_extrapolation.gif"))
+
+    print(f"Telemetry written to '{telemetry.path}'.")
@@ -1,9 +1,14 @@
 import streamlit as st
+from streamlit.errors import StreamlitAPIException
 import time
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import base64 # <-- ADICIONE ESTA LINHA
+import zlib
+from html import escape
+
+# Only light modules are imported up front. pandas, NumPy and the time-series and
+# soft-sensor modules are imported inside the sections that use them, so a cold
+# start and a visitor who never opens those sections do not pay for them.
+from knowledge_store import open_store
+from site_media import show_animation, show_stylesheet
 
 # --- 1. Page Configuration & Initial State ---
 st.set_page_config(
@@ -13,142 +18,194 @@ st.set_page_config(
 )
 
 # --- 2. Custom CSS for Styling (MODIFIED FOR DARK MODE) ---
-st.markdown("""
-<style>
-    /* CSS Geral */
-    .block-container { padding-top: 2rem; }
-    .main-content-container { max-width: 1100px; margin: auto; }
-    
-    /* CSS dos Cards de Projeto (AGORA COMPATÍVEL COM DARK MODE) */
-    .project-card { 
-        background-color: var(--secondary-background-color); /* Usa a cor de fundo secundária do tema */
-        border: 1px solid var(--gray-200);
-        border-radius: 10px; 
-        padding: 25px; 
-        height: 100%; 
-    }
-    .project-card:hover { 
-        border-color: var(--gray-400); 
-        box-shadow: 0 8px 24px rgba(0,0,0,0.07); 
-    }
-    .project-title { 
-        font-size: 1.5rem; 
-        font-weight: 600; 
-        color: var(--text-color); /* Usa a cor de texto principal do tema */
-        margin-bottom: 1rem; 
-    }
-    .metric-number { font-size: 2.2rem; font-weight: bold; color: #00A98F; }
-    h3 { 
-        font-weight: 600; 
-        color: var(--text-color); /* Usa a cor de texto principal do tema */
-    }
-
-    /* CSS dos Botões de Prompt (AGORA COMPATÍVEL COM DARK MODE) */
-    .stButton>button { 
-        background-color: var(--secondary-background-color); /* Fundo do botão acompanha o tema */
-        border: 1px solid #00A98F; 
-        color: #00A98F; 
-        font-weight: bold; 
-    }
-    .stButton>button:hover { 
-        border: 1px solid #007A68; 
-        color: #007A68; 
-    }
-
-    /* CSS PARA OS CARDS DA SEÇÃO DE VISÃO (AGORA COMPATÍVEL COM DARK MODE) */
-    .vision-card {
-        background-color: var(--secondary-background-color);
-        border: 1px solid var(--gray-200);
-        border-radius: 10px;
-        padding: 20px;
-        height: 100%;
-        text-align: center;
-    }
-    .vision-card h4 {
-        font-weight: 600;
-        color: var(--text-color);
-        margin-top: 10px;
-    }
-    .vision-card p {
-        color: var(--text-color);
-    }
-</style>
-""", unsafe_allow_html=True)
+# The rules live in static/site.css; every rerun only sends the versioned <link> tag.
+show_stylesheet("static/site.css")
 
 
 # --- 3. ENHANCED RESPONSE FUNCTIONS ---
+# Answers are read from the local knowledge store (knowledge_store.py), which is
+# opened once per server process and shared by every rerun and session. The
+# cards and tables of the guided responses never change, so the *_content()
+# functions build them once per process too; sessions only hold message IDs.
+# Store fields are plant data, so they are escaped before going into card HTML.
+@st.cache_resource(show_spinner=False)
+def knowledge_store():
+    return open_store()
+
+def format_date(iso_date):
+    year, month, day = iso_date.split("-")
+    return f"{month}/{day}/{year}"
+
+def document_line(doc):
+    if doc["kind"] == "DOI":
+        return f"* [DOI] {doc['doc_id']}"
+    if doc["kind"] == "Book":
+        return f"* [Book] {doc['title']}"
+    return f"* [{doc['kind']}] `{doc['doc_id']}` - {doc['title']}"
+
+@st.cache_resource(show_spinner=False)
+def pump_maintenance_content():
+    """``(sources caption, [card HTML per asset])``."""
+    records = knowledge_store().maintenance_history(unit="Unit 1", asset_class="Pump")
+    sources = dict.fromkeys(r["source"] for r in records)  # in order of appearance
+    by_asset = {}
+    for record in records:
+        by_asset.setdefault(record["asset_description"], []).append(record)
+    cards = []
+    for asset, asset_records in by_asset.items():
+        items = "".join(f"<li><b>{escape(format_date(r['date']))}:</b> {escape(r['description'])} "
+                        f"<i>(Cost: ${r['cost']:,.2f})</i></li>" for r in asset_records)
+        cards.append(f'<div class="response-card"><h5>{escape(asset)}</h5><ul>{items}</ul></div>')
+    return f"Data sources: {', '.join(sources)}", cards
 
 def display_pump_maintenance_response():
+    sources, cards = pump_maintenance_content()
     st.markdown("**Consolidated Maintenance History for the Transfer Pump Unit**")
-    st.caption("Data sources: IBM Maximo, SAP")
+    st.caption(sources)
+    for col, card in zip(st.columns(max(len(cards), 1)), cards):
+        with col:
+            st.markdown(card, unsafe_allow_html=True)
 
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        st.markdown("""
-        <div class="response-card">
-            <h5>Pump P-102 (Centrifugal)</h5>
-            <ul>
-                <li><b>07/15/2025:</b> Pump-motor realignment after vibration alert. <i>(Cost: $2,200.00)</i></li>
-                <li><b>05/28/2025:</b> Mechanical seal replacement (preventive). <i>(Cost: $850.00)</i></li>
-            </ul>
-        </div>
-        """, unsafe_allow_html=True)
-    with col2:
-        st.markdown("""
-        <div class="response-card">
-            <h5>Pump P-103 (Positive Displacement)</h5>
-            <ul>
-                <li><b>06/20/2025:</b> Bearing lubrication and operational check. <i>(Cost: $450.00)</i></li>
-            </ul>
-        </div>
-        """, unsafe_allow_html=True)
-    with col3:
-        st.markdown("""
-        <div class="response-card">
-            <h5>Pump P-104 (Vacuum)</h5>
-            <ul>
-                <li><b>03/12/2025:</b> Major overhaul (bearing and shaft replacement). <i>(Cost: $8,200.00)</i></li>
-            </ul>
-        </div>
-        """, unsafe_allow_html=True)
+@st.cache_resource(show_spinner=False)
+def fermentation_content():
+    """``([card HTML per tag], literature markdown)``."""
+    store = knowledge_store()
+    tags = store.search_tags(unit="Unit 1", process="Stem Cell Fermentation")
+    cards = [f'<div class="response-card"><b>{i}. {escape(tag["tag_type"])}</b><br>{escape(tag["notes"] or tag["description"])}'
+             f'<br><code>{escape(tag["tag_id"])}</code></div>' for i, tag in enumerate(tags, start=1)]
+    literature = "\n".join(document_line(doc) for doc in store.documents(process="Stem Cell Fermentation"))
+    return cards, literature
 
 def display_fermentation_response():
+    cards, literature = fermentation_content()
     st.markdown("**Optimization Parameters for Stem Cell Fermentation Process**")
     st.caption("Data sources: QMS, PI System")
     
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        st.markdown('<div class="response-card"><b>1. pH</b><br>Affects enzymatic activity.<br><code>PI-FERM-F-301-PH</code></div>', unsafe_allow_html=True)
-    with col2:
-        st.markdown('<div class="response-card"><b>2. Temperature</b><br>Controls reaction kinetics.<br><code>PI-FERM-F-301-TEMP-PV</code></div>', unsafe_allow_html=True)
-    with col3:
-        st.markdown('<div class="response-card"><b>3. Dissolved Oxygen (DO)</b><br>Crucial for aerobic microorganisms.<br><code>PI-FERM-F-301-O2</code></div>', unsafe_allow_html=True)
+    for col, card in zip(st.columns(max(len(cards), 1)), cards):
+        with col:
+            st.markdown(card, unsafe_allow_html=True)
             
     with st.expander("**Related Literature (source: QMS)**"):
-        st.markdown("""
-        * [Book] "Bioprocess Engineering Principles" by Pauline M. Doran
-        * [DOI] https://doi.org/10.1016/C2009-0-22348-8
-        * [Manual] `MAN-ENG-FERM-301-V02` - Fermentor F-301 Operation Manual
-        """)
+        st.markdown(literature)
+
+@st.cache_resource(show_spinner=False)
+def salicylic_acid_content():
+    """``(tags, tag table DataFrame, drawings markdown)``; the DataFrame is shared read-only."""
+    import pandas as pd
+
+    store = knowledge_store()
+    tags = store.search_tags(unit="Unit 2", process="Salicylic Acid Manufacturing")
+    table = pd.DataFrame({
+        'Tag ID': [t["tag_id"] for t in tags],
+        'Description': [t["description"] for t in tags],
+        'Tag Type': [t["tag_type"] for t in tags],
+        'Process Stage': [t["stage"] for t in tags],
+    })
+    drawings = "\n".join(f"* [{doc['doc_id']}] - {doc['title']}"
+                         for doc in store.documents(process="Salicylic Acid Manufacturing", kind="Drawing"))
+    return tags, table, drawings
 
 def display_salicylic_acid_response():
+    tags, table, drawings = salicylic_acid_content()
     st.markdown("**Consolidated Tag List for the Salicylic Acid Manufacturing Process (Synthesis Stage):**")
-    data = {
-        'Tag ID': ['PI-R101-TEMP-PV', 'PI-R101-PRESS-PV', 'PI-R101-ACID-FLOW', 'PI-P-103-RUN'],
-        'Description': ['Reactor R-101 Temperature', 'Reactor R-101 Pressure', 'Sulfuric Acid Flow', 'Pump P-103 Status'],
-        'Tag Type': ['Temperature', 'Pressure', 'Flow', 'Motor'],
-        'Process Stage': ['Synthesis Reactor', 'Synthesis Reactor', 'Synthesis Reactor', 'Product Transfer']
-    }
-    df = pd.DataFrame(data)
-    st.dataframe(df, hide_index=True, use_container_width=True)
+    st.dataframe(table, hide_index=True, use_container_width=True)
     
     st.markdown("**Related Drawings (source: EDMS):**")
-    st.markdown("* [P&ID-PROD-SA-REV04] - Piping and Instrumentation Diagram")
+    st.markdown(drawings)
     
     st.markdown("""
     ---
     **Would you like to check the current status of any of these tags or view the alarm history for the Synthesis Reactor?**
     """)
+    display_tag_trend(tags)
+
+# Tag history lives in memory-mapped column files (timeseries_store.py). The demo
+# fills them with synthetic 1-second data the first time the process needs them.
+TREND_DAYS = 7
+TREND_PROFILES = {"Temperature": (85.0, 4.0), "Pressure": (2.5, 0.3), "Flow": (12.0, 1.5), "Motor": (1.0, 0.0)}
+TREND_WINDOWS = {"Last hour": 1, "Last day": 24, "Last 7 days": 24 * TREND_DAYS}  # hours
+CHART_WIDTH_PX = 1000  # the content column is at most 1100px wide; one point per pixel is enough
+
+@st.cache_resource(show_spinner="Loading tag history...")
+def trend_store(tags):
+    from timeseries_store import TimeSeriesStore, write_synthetic
+
+    store = TimeSeriesStore()
+    for tag_id, tag_type in tags:
+        if tag_id not in store:
+            level, scale = TREND_PROFILES.get(tag_type, (0.0, 1.0))
+            write_synthetic(store, tag_id, TREND_DAYS, level=level, scale=scale, seed=zlib.crc32(tag_id.encode()))
+    return store
+
+def display_tag_trend(tags):
+    import numpy as np
+    import pandas as pd
+
+    store = trend_store(tuple((t["tag_id"], t["tag_type"]) for t in tags))
+    col1, col2 = st.columns([2, 1])
+    with col1:
+        tag_id = st.selectbox("Tag history", [t["tag_id"] for t in tags], key="trend_tag")
+    with col2:
+        window = st.selectbox("Window", list(TREND_WINDOWS), index=1, key="trend_window")
+    latest = store.latest(tag_id)
+    if latest is None:
+        st.info(f"No samples recorded for {tag_id} yet.")
+        return
+    last_time, last_value = latest
+    start = time.perf_counter()
+    # Only about one point per pixel is sent to the browser
+    trend = store.query(tag_id, start=last_time - np.timedelta64(TREND_WINDOWS[window], "h"), n_out=CHART_WIDTH_PX)
+    elapsed = time.perf_counter() - start
+    st.metric(f"{tag_id} (current value)", f"{last_value:,.2f}")
+    st.line_chart(pd.DataFrame({"Time": trend["timestamps"], tag_id: trend["values"]}), x="Time", y=tag_id)
+    st.caption(f"{trend['n_raw']:,} samples downsampled to {len(trend['values']):,} points (MinMax-LTTB) "
+               f"in {elapsed * 1000:.0f} ms")
+
+# The trained PINN is served by the NumPy runtime (mlp_runtime.py), so the web
+# process never imports torch. pinn_vs_nn.py writes the exported weights.
+SOFT_SENSOR_PATH = "models/pinn_soft_sensor.npz"
+
+@st.cache_resource(show_spinner=False)
+def soft_sensor():
+    from mlp_runtime import load_runtime
+
+    return load_runtime(SOFT_SENSOR_PATH)
+
+@st.fragment
+def soft_sensor_demo():
+    # Loaded on request: the model, NumPy and the chart stay out of the first page load
+    if not st.toggle("Try the PINN soft sensor", key="soft_sensor_on"):
+        return
+    import numpy as np
+    import pandas as pd
+
+    try:
+        sensor = soft_sensor()
+    except FileNotFoundError:
+        st.caption(f"Soft sensor model '{SOFT_SENSOR_PATH}' not found. Run pinn_vs_nn.py to export it.")
+        return
+    meta = sensor.metadata
+    t_query = st.slider("Time (s)", float(meta["t_min"]), float(meta["t_max"]), value=7.5, step=0.1,
+                        key="soft_sensor_t")
+    t_grid = np.linspace(meta["t_min"], meta["t_max"], 400)
+    A_pred = float(sensor.predict([t_query])[0])
+    A_real = meta["A0"] * np.exp(-meta["k"] * t_query)
+    zone = "extrapolation" if t_query > meta["t_max_train"] else "training window"
+    st.metric(f"PINN soft sensor: [A] at t = {t_query:.1f} s ({zone})", f"{A_pred:.4f}",
+              delta=f"{A_pred - A_real:+.4f} vs. real process", delta_color="off")
+    st.line_chart(pd.DataFrame({"Time (s)": t_grid, "PINN": sensor.predict(t_grid),
+                                "Real Process": meta["A0"] * np.exp(-meta["k"] * t_grid)}), x="Time (s)")
+
+def display_tag_search():
+    query = st.text_input("Search the tag index (tag ID, asset, description or process)", key="tag_search")
+    if query:
+        import pandas as pd
+
+        results = knowledge_store().search_tags(query, limit=50)
+        if results:
+            st.dataframe(pd.DataFrame(results), hide_index=True, use_container_width=True)
+        else:
+            st.caption(f"No tags match '{query}'.")
 
 # --- 4. Main Page Layout ---
 with st.container():
@@ -200,25 +257,17 @@ with st.container():
             The AI model is penalized if its predictions violate the laws of physics. The result is a model that not only fits the data but is also **consistent with the process reality**, as the animation below illustrates.
             """)
             # --- BLOCO DE CÓDIGO MODIFICADO PARA EXIBIR O GIF ---
-            # Nota: Certifique-se de que o nome do arquivo aqui é o que você quer exibir.
-            # Nossa discussão foi sobre o 'pinn_vs_nn_extrapolation.gif', mas o seu código usa 'pinn_animation.gif'.
-            # Ajuste o nome conforme necessário.
-            gif_path = "pinn_vs_nn_extrapolation.gif" 
+            # O GIF é servido como arquivo estático (static/, ver site_media.py) com URL estável,
+            # em vez de ser relido e codificado em base64 a cada rerun. Navegadores com suporte a WebP
+            # recebem a versão compacta gerada por animation_export.py.
+            gif_path = "static/pinn_vs_nn_extrapolation.gif"
 
             try:
-                # Lê o arquivo GIF em modo binário
-                with open(gif_path, "rb") as f:
-                    contents = f.read()
-                    data_url = base64.b64encode(contents).decode("utf-8")
-                
-                # Exibe o GIF embutido diretamente no HTML da página
-                st.markdown(
-                    f'<img src="data:image/gif;base64,{data_url}" alt="PINN vs NN animation">',
-                    unsafe_allow_html=True,
-                )
+                show_animation(gif_path, alt="PINN vs NN animation")
             except FileNotFoundError:
-                st.error(f"Arquivo '{gif_path}' não encontrado. Por favor, certifique-se de que ele está na mesma pasta que o script do Streamlit.")
+                st.error(f"Arquivo '{gif_path}' não encontrado. Por favor, certifique-se de que ele está na pasta 'static' ao lado do script do Streamlit.")
             # --- FIM DO BLOCO MODIFICADO ---
+            soft_sensor_demo()
         st.markdown('</div>', unsafe_allow_html=True)
         
     st.markdown('</div>', unsafe_allow_html=True)
@@ -234,50 +283,65 @@ This is a **conceptual demonstration** that illustrates a core vision: solving t
 """)
 st.info("This is a guided demonstration. Click the button that appears at each step to continue the conversation.", icon="👇")
 
-if "messages" not in st.session_state:
-    st.session_state.messages = []
+# Each turn of the guided conversation: (prompt button, response). The prompt text and
+# the response code are module-level and shared by every session; a session only
+# stores how far it has got (conversation_step) and whether a reply is pending.
+CONVERSATION = (
+    ("pump maintenance history from unit 1", display_pump_maintenance_response),
+    ("fermentation parameters from unit 1", display_fermentation_response),
+    ("salicylic acid tags from unit 2", display_salicylic_acid_response),
+)
+THINKING_SECONDS = 1.5
+
+def thinking_seconds():
+    """The "thinking" pause; the ``demo_thinking_seconds`` secret overrides it (benchmarks.py sets 0)."""
+    try:
+        return max(float(st.secrets.get("demo_thinking_seconds", THINKING_SECONDS)), 0.0)
+    except (FileNotFoundError, TypeError, ValueError):  # no secrets file, or a malformed value
+        return THINKING_SECONDS
+
+if "conversation_step" not in st.session_state:
     st.session_state.conversation_step = 0
     st.session_state.is_thinking = False
 
-for message in st.session_state.messages:
-    with st.chat_message(message["role"]):
-        message["function"]()
+# Every turn is a fragment, and the next turn is a fragment nested inside it. A click
+# reruns only the innermost fragment, the turn being asked: neither the CSS, hero,
+# project cards and GIF above nor the earlier turns are re-executed or re-sent, so
+# a click costs the same however long the history is.
+def rerun_conversation():
+    try:
+        st.rerun(scope="fragment")
+    except StreamlitAPIException:
+        # Fragment-scoped reruns are only allowed during a fragment run (e.g. not on a
+        # full page load that resumes a "thinking" step), so fall back to a full rerun
+        st.rerun()
+
+@st.fragment
+def conversation_turn(step):
+    if step == len(CONVERSATION):
+        st.success("This concludes the guided demonstration. The full chat history is available above.", icon="✅")
+        display_tag_search()
+        return
+
+    prompt, response = CONVERSATION[step]
+    if st.session_state.conversation_step == step:
+        if st.button(prompt):
+            st.session_state.conversation_step = step + 1
+            st.session_state.is_thinking = True
+            rerun_conversation()  # redraw this turn without its button
+        return
 
-if st.session_state.is_thinking:
+    with st.chat_message("user"):
+        st.markdown(prompt)
     with st.chat_message("assistant"):
-        with st.spinner("Thinking..."):
-            time.sleep(1.5)
-            if st.session_state.conversation_step == 1:
-                response_func = display_pump_maintenance_response
-            elif st.session_state.conversation_step == 2:
-                response_func = display_fermentation_response
-            elif st.session_state.conversation_step == 3:
-                response_func = display_salicylic_acid_response
-            st.session_state.messages.append({"role": "assistant", "function": response_func})
+        if st.session_state.is_thinking and st.session_state.conversation_step == step + 1:
+            with st.spinner("Thinking..."):
+                time.sleep(thinking_seconds())
             st.session_state.is_thinking = False
-            st.rerun()
+        response()
+    conversation_turn(step + 1)
 
-elif not st.session_state.is_thinking:
-    if st.session_state.conversation_step == 0:
-        if st.button("pump maintenance history from unit 1"):
-            st.session_state.messages.append({"role": "user", "function": lambda: st.markdown("pump maintenance history from unit 1")})
-            st.session_state.conversation_step = 1
-            st.session_state.is_thinking = True
-            st.rerun()
-    elif st.session_state.conversation_step == 1:
-        if st.button("fermentation parameters from unit 1"):
-            st.session_state.messages.append({"role": "user", "function": lambda: st.markdown("fermentation parameters from unit 1")})
-            st.session_state.conversation_step = 2
-            st.session_state.is_thinking = True
-            st.rerun()
-    elif st.session_state.conversation_step == 2:
-        if st.button("salicylic acid tags from unit 2"):
-            st.session_state.messages.append({"role": "user", "function": lambda: st.markdown("salicylic acid tags from unit 2")})
-            st.session_state.conversation_step = 3
-            st.session_state.is_thinking = True
-            st.rerun()
-    elif st.session_state.conversation_step == 3:
-        st.success("This concludes the guided demonstration. The full chat history is available above.", icon="✅")
+conversation_turn(0)
 
 st.markdown('</div>', unsafe_allow_html=True)
 
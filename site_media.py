@@ -0,0 +1,72 @@
+"""Media helpers for the Streamlit site.
+
+Images, animations and the site stylesheet are served from the ``static/``
+folder through Streamlit's static file serving (``server.enableStaticServing``,
+see ``.streamlit/config.toml``), so the page only carries a short, stable URL.
+The browser downloads the file once and revalidates it with ETag/Last-Modified
+instead of receiving it again inside every rerun. The URL carries a content
+hash, so a regenerated file gets a new URL.
+
+When static serving is disabled or the file lives elsewhere, the file is
+embedded as a base64 data URL. The encoding is cached per process and keyed on
+the file's mtime, so reruns and new sessions reuse it.
+"""
+import base64
+import hashlib
+import mimetypes
+import os
+
+import streamlit as st
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+
+
+def _mtime(path):
+    # Raises FileNotFoundError for a missing file, like open() did before
+    return os.stat(path).st_mtime_ns
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def _content_hash(path, mtime):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:12]
+
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def _data_url(path, mtime):
+    mime = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    with open(path, "rb") as f:
+        return f"data:{mime};base64,{base64.b64encode(f.read()).decode('utf-8')}"
+
+
+def media_url(path):
+    """URL for ``path``: a versioned ``app/static/`` URL when possible, else a cached data URL."""
+    path = os.path.abspath(path)
+    mtime = _mtime(path)
+    in_static_dir = os.path.dirname(path) == STATIC_DIR
+    if in_static_dir and st.get_option("server.enableStaticServing"):
+        return f"app/static/{os.path.basename(path)}?v={_content_hash(path, mtime)}"
+    return _data_url(path, mtime)
+
+
+def show_image(path, alt=""):
+    """Render an image (animated GIFs included) as a plain ``<img>`` tag."""
+    st.markdown(f'<img src="{media_url(path)}" alt="{alt}">', unsafe_allow_html=True)
+
+
+def show_animation(path, alt=""):
+    """Render an animated GIF, preferring the compact copies written by ``animation_export.py``.
+
+    Browsers that support WebP get ``<stem>.optimized.webp``; the others fall back
+    to ``<stem>.optimized.gif``, or to ``path`` itself when it was not re-encoded.
+    """
+    stem = os.path.splitext(path)[0]
+    webp, gif = f"{stem}.optimized.webp", f"{stem}.optimized.gif"
+    fallback = media_url(gif if os.path.exists(gif) else path)
+    source = f'<source srcset="{media_url(webp)}" type="image/webp">' if os.path.exists(webp) else ""
+    st.markdown(f'<picture>{source}<img src="{fallback}" alt="{alt}"></picture>', unsafe_allow_html=True)
+
+
+def show_stylesheet(path):
+    """Apply a CSS file through a ``<link>`` tag, so reruns send a URL instead of the whole stylesheet."""
+    st.markdown(f'<link rel="stylesheet" href="{media_url(path)}">', unsafe_allow_html=True)
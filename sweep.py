@@ -0,0 +1,206 @@
+"""Parallel NN vs. PINN scenario sweep.
+
+Runs the comparison from ``pinn_vs_nn.py`` over a grid of rate constant ``k``,
+noise level, number of training points, training-window fraction and network
+width/depth. Scenarios are fanned out over a process pool; every worker pins
+``torch.set_num_threads`` so that ``workers * threads_per_worker`` does not
+oversubscribe the machine. Each finished scenario is appended to a CSV file
+right away, and scenarios already in the file are skipped, so an interrupted
+sweep resumes where it stopped. A scenario that raises is reported and left
+out of the file, so the next run retries it.
+
+Usage:
+    python sweep.py --k 0.2 0.5 1.0 --noise 0.01 0.03 0.1 --epochs 5000 --workers 8
+"""
+import argparse
+import csv
+import itertools
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import torch
+
+from model_cache import config_key
+
+RESULT_FIELDS = [
+    "scenario_id", "k", "noise_std", "n_train_points", "train_fraction", "width", "depth", "seed", "epochs",
+    "n_physics_points", "nn_extrapolation_rmse", "pinn_extrapolation_rmse", "nn_final_loss", "pinn_final_loss",
+    "nn_train_s", "pinn_train_s",
+]
+
+
+# --- 1. Scenario Grid ---
+def scenario_grid(ks=(0.5,), noise_stds=(0.03,), n_train_points=(8,), train_fractions=(0.5,),
+                  widths=(20,), depths=(3,), seeds=(42,), epochs=20000, n_physics_points=100):
+    """Cartesian product of the sweep axes as a list of scenario dicts."""
+    scenarios = []
+    for k, noise_std, n_train, fraction, width, depth, seed in itertools.product(
+            ks, noise_stds, n_train_points, train_fractions, widths, depths, seeds):
+        scenario = {
+            "k": k, "noise_std": noise_std, "n_train_points": n_train, "train_fraction": fraction,
+            "width": width, "depth": depth, "seed": seed, "epochs": epochs,
+            "n_physics_points": n_physics_points,
+        }
+        scenario["scenario_id"] = config_key(scenario)
+        scenarios.append(scenario)
+    return scenarios
+
+
+# --- 2. One Scenario ---
+def run_scenario(scenario):
+    """Train the NN and the PINN for one scenario and return a result row."""
+    from pinn_vs_nn import (
+        create_network, extrapolation_rmse, make_training_data, predict, t_max, t_min, train_nn, train_pinn,
+    )
+
+    k, seed, epochs = scenario["k"], scenario["seed"], scenario["epochs"]
+    t_max_train = t_min + scenario["train_fraction"] * (t_max - t_min)
+    t_train_np, A_train_np = make_training_data(
+        n_train_points=scenario["n_train_points"], t_max_train=t_max_train,
+        noise_std=scenario["noise_std"], k=k, seed=seed)
+    t_train = torch.tensor(t_train_np).float().view(-1, 1)
+    A_train = torch.tensor(A_train_np).float().view(-1, 1)
+    t_physics = torch.linspace(t_min, t_max, scenario["n_physics_points"]).view(-1, 1)
+    t_test = torch.linspace(t_min, t_max, 300).view(-1, 1)
+
+    torch.manual_seed(seed)
+    nn_model = create_network(scenario["width"], scenario["depth"])
+    pinn_model = create_network(scenario["width"], scenario["depth"])
+
+    start = time.perf_counter()
+    nn_history = train_nn(nn_model, t_train, A_train, epochs=epochs, log_every=0)
+    nn_time = time.perf_counter() - start
+    start = time.perf_counter()
+    pinn_history = train_pinn(pinn_model, t_train, A_train, t_physics, k, epochs=epochs, log_every=0)
+    pinn_time = time.perf_counter() - start
+
+    t_test_np = t_test.numpy()
+    row = {field: scenario[field] for field in RESULT_FIELDS if field in scenario}
+    row.update({
+        "nn_extrapolation_rmse": extrapolation_rmse(predict(nn_model, t_test), t_test_np, k, t_max_train=t_max_train),
+        "pinn_extrapolation_rmse": extrapolation_rmse(predict(pinn_model, t_test), t_test_np, k,
+                                                      t_max_train=t_max_train),
+        "nn_final_loss": nn_history[-1] if nn_history else float("nan"),
+        "pinn_final_loss": pinn_history[-1] if pinn_history else float("nan"),
+        "nn_train_s": nn_time,
+        "pinn_train_s": pinn_time,
+    })
+    return row
+
+
+# --- 3. Process Pool and Incremental Results ---
+def _init_worker(threads_per_worker):
+    torch.set_num_threads(threads_per_worker)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass  # already set in this process
+
+
+def _complete_row(row):
+    """False for a row cut short by an interrupted write (missing, extra or unparsable fields)."""
+    if None in row or any(not row.get(field) for field in RESULT_FIELDS):
+        return False
+    try:
+        for field in RESULT_FIELDS[RESULT_FIELDS.index("nn_extrapolation_rmse"):]:
+            float(row[field])
+    except ValueError:
+        return False
+    return True
+
+
+def completed_ids(path):
+    """Scenario ids with a complete row in ``path``; malformed rows are ignored so they get re-run.
+
+    Raises ValueError if ``path`` was written with different columns, since appending to it would
+    misalign the new rows.
+    """
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return set()
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        if reader.fieldnames != RESULT_FIELDS:
+            raise ValueError(f"{path} has columns {reader.fieldnames}, expected {RESULT_FIELDS}; "
+                             "write the results to a new file")
+        return {row["scenario_id"] for row in reader if _complete_row(row)}
+
+
+def _ends_with_newline(path):
+    with open(path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+def run_sweep(scenarios, out_path="sweep_results.csv", workers=None, threads_per_worker=1):
+    """Run every scenario not yet in ``out_path``, appending one CSV row per finished scenario.
+
+    Returns ``(finished, failed)``: the number of rows written and the ids of the scenarios that raised.
+    """
+    workers = workers or max(1, (os.cpu_count() or 1) // threads_per_worker)
+    done = completed_ids(out_path)
+    pending = [s for s in scenarios if s["scenario_id"] not in done]
+    print(f"{len(scenarios)} scenarios, {len(done)} already done, {len(pending)} to run "
+          f"on {workers} workers x {threads_per_worker} threads.")
+    if not pending:
+        return 0, []
+
+    write_header = not os.path.exists(out_path) or os.path.getsize(out_path) == 0
+    # A row cut off mid-write has no line ending; start the next row on a fresh line
+    if not write_header and not _ends_with_newline(out_path):
+        with open(out_path, "a", newline="", encoding="utf-8") as f:
+            f.write("\r\n")
+    start = time.perf_counter()
+    finished = 0
+    failed = []
+    # spawn: forked children would inherit the parent's torch thread pools
+    context = multiprocessing.get_context("spawn")
+    with open(out_path, "a", newline="", encoding="utf-8") as f, \
+            ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                initializer=_init_worker, initargs=(threads_per_worker,)) as pool:
+        writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS)
+        if write_header:
+            writer.writeheader()
+        futures = {pool.submit(run_scenario, s): s["scenario_id"] for s in pending}
+        for future in as_completed(futures):
+            try:
+                row = future.result()
+            except Exception as exc:
+                failed.append(futures[future])
+                print(f"[failed] {futures[future]}: {type(exc).__name__}: {exc}")
+                continue
+            writer.writerow(row)
+            f.flush()
+            finished += 1
+            elapsed = time.perf_counter() - start
+            print(f"[{finished}/{len(pending)}] {row['scenario_id']}: NN {row['nn_extrapolation_rmse']:.4f}, "
+                  f"PINN {row['pinn_extrapolation_rmse']:.4f} ({finished / elapsed * 60:.1f} scenarios/min)")
+    if failed:
+        print(f"{len(failed)} scenarios failed and will be retried on the next run: {', '.join(failed)}")
+    return finished, failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--k", type=float, nargs="+", default=[0.5])
+    parser.add_argument("--noise", type=float, nargs="+", default=[0.03])
+    parser.add_argument("--n-train", type=int, nargs="+", default=[8])
+    parser.add_argument("--train-fraction", type=float, nargs="+", default=[0.5])
+    parser.add_argument("--width", type=int, nargs="+", default=[20])
+    parser.add_argument("--depth", type=int, nargs="+", default=[3])
+    parser.add_argument("--seeds", type=int, nargs="+", default=[42])
+    parser.add_argument("--epochs", type=int, default=20000)
+    parser.add_argument("--n-physics", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--threads-per-worker", type=int, default=1)
+    parser.add_argument("--out", default="sweep_results.csv")
+    args = parser.parse_args(argv)
+
+    scenarios = scenario_grid(args.k, args.noise, args.n_train, args.train_fraction, args.width, args.depth,
+                              args.seeds, epochs=args.epochs, n_physics_points=args.n_physics)
+    run_sweep(scenarios, args.out, workers=args.workers, threads_per_worker=args.threads_per_worker)
+
+
+if __name__ == "__main__":
+    main()
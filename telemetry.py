@@ -0,0 +1,203 @@
+"""Training telemetry: stage timers, sampled loss components and profiler hooks.
+
+Each run writes its own JSONL file (``telemetry/pinn_vs_nn-<timestamp>.jsonl``
+by default), one compact JSON object per line, written as the run goes:
+
+* ``{"event": "stage", "name": ..., "seconds": ...}``: wall time of a stage
+  of ``pinn_vs_nn.py`` (data generation, training, prediction, export,
+  animation).
+* ``{"event": "loss", "run": ..., "step": ..., "t": ..., "loss": ..., ...}``:
+  loss components every ``stride`` steps. The training loop hands over
+  detached tensors, which are buffered and converted in one ``tolist()`` per
+  ``flush_every`` samples. So sampling never calls ``.item()`` inside the loop
+  (on a GPU, that would force a device sync every sampled step).
+* ``{"event": "profile", ...}``: the top operators of ``profile_steps`` steps
+  run under ``torch.profiler``, when enabled. The Chrome trace is written next
+  to the log.
+
+Used as a context manager, the log is closed with an ``end`` event (carrying
+the error, if the run failed) however the ``with`` block exits.
+
+``load_log`` reads a log back as pandas DataFrames for charting.
+
+Usage (measures the logging overhead on the PINN loop):
+    python telemetry.py
+"""
+import json
+import os
+import time
+from contextlib import contextmanager
+
+import torch
+
+TELEMETRY_DIR = "telemetry"
+
+
+class RunLogger:
+    """Per-training-run sampler; get one from ``Telemetry.run``."""
+
+    def __init__(self, telemetry, name, stride, flush_every, profiler=None):
+        self.telemetry = telemetry
+        self.name = name
+        self.stride = stride
+        self.flush_every = flush_every
+        self.profiler = profiler
+        self._start = time.perf_counter()
+        self._names = None
+        self._steps, self._times, self._values = [], [], []
+        if profiler is not None:
+            profiler.start()
+
+    def step(self, step, **losses):
+        """Call once per training step with the (graph-attached or detached) loss tensors."""
+        if self.profiler is not None:
+            self.profiler.step()
+        if step % self.stride:
+            return
+        if self._names is None:
+            self._names = list(losses)
+        self._steps.append(step)
+        self._times.append(time.perf_counter() - self._start)
+        self._values.append(torch.stack([value.detach() for value in losses.values()]))
+        if len(self._values) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        if not self._values:
+            return
+        # One host transfer for the whole buffer
+        values = torch.stack(self._values).tolist()
+        for step, elapsed, row in zip(self._steps, self._times, values):
+            self.telemetry.write({"event": "loss", "run": self.name, "step": step, "t": round(elapsed, 6),
+                                  **dict(zip(self._names, row))})
+        self._steps, self._times, self._values = [], [], []
+
+    def close(self):
+        self.flush()
+        if self.profiler is not None:
+            self.profiler.stop()
+            self.profiler = None
+        self.telemetry._runs.discard(self)
+
+
+class Telemetry:
+    """JSONL telemetry log.
+
+    ``profile_run`` names the run (e.g. ``"pinn"``) whose steps
+    ``profile_wait`` to ``profile_wait + profile_steps`` are recorded with
+    ``torch.profiler``; None disables profiling.
+    """
+
+    def __init__(self, path=None, stride=100, flush_every=50, profile_run=None, profile_wait=100,
+                 profile_steps=20, **metadata):
+        if path is None:
+            path = os.path.join(TELEMETRY_DIR, f"pinn_vs_nn-{time.strftime('%Y%m%d-%H%M%S')}.jsonl")
+        self.path = path
+        self.stride = stride
+        self.flush_every = flush_every
+        self.profile_run = profile_run
+        self.profile_wait = profile_wait
+        self.profile_steps = profile_steps
+        self._runs = set()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # Append: an existing log is never truncated, even if two runs pick the same name
+        self._file = open(path, "a", encoding="utf-8")
+        self.write({"event": "start", "time": time.time(), "stride": stride, **metadata})
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(error=None if exc_type is None else f"{exc_type.__name__}: {exc}")
+        return False
+
+    def write(self, record):
+        self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_stage(name, time.perf_counter() - start)
+
+    def record_stage(self, name, seconds):
+        """Log a stage timed elsewhere (e.g. work done at import time)."""
+        self.write({"event": "stage", "name": name, "seconds": round(seconds, 6)})
+        self._file.flush()
+
+    def run(self, name, stride=None):
+        profiler = self._profiler(name) if name == self.profile_run else None
+        logger = RunLogger(self, name, stride or self.stride, self.flush_every, profiler)
+        self._runs.add(logger)
+        return logger
+
+    def _profiler(self, name):
+        from torch.profiler import ProfilerActivity, profile, schedule
+
+        def on_trace_ready(prof):
+            trace = os.path.splitext(self.path)[0] + f".{name}.trace.json"
+            prof.export_chrome_trace(trace)
+            top = sorted(prof.key_averages(), key=lambda e: e.self_cpu_time_total, reverse=True)[:15]
+            self.write({"event": "profile", "run": name, "steps": self.profile_steps, "trace": trace,
+                        "ops": [{"name": e.key, "calls": e.count, "self_cpu_us": round(e.self_cpu_time_total, 1),
+                                 "cpu_us": round(e.cpu_time_total, 1)} for e in top]})
+
+        activities = [ProfilerActivity.CPU] + ([ProfilerActivity.CUDA] if torch.cuda.is_available() else [])
+        return profile(activities=activities, on_trace_ready=on_trace_ready,
+                       schedule=schedule(wait=self.profile_wait, warmup=1, active=self.profile_steps, repeat=1))
+
+    def close(self, error=None):
+        if self._file.closed:
+            return
+        for run in list(self._runs):
+            run.close()
+        end = {"event": "end", "time": time.time()}
+        if error is not None:
+            end["error"] = error
+        self.write(end)
+        self._file.close()
+
+
+def load_log(path):
+    """``(stages, losses, profiles)`` DataFrames from a telemetry log."""
+    import pandas as pd
+
+    with open(path, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    by_event = {event: pd.DataFrame([r for r in records if r["event"] == event]) for event in ("stage", "loss", "profile")}
+    return by_event["stage"], by_event["loss"], by_event["profile"]
+
+
+# --- Overhead Check ---
+def measure_overhead(epochs=2000, strides=(1, 100), repeat=5):
+    """Seconds per PINN step without telemetry and with each stride (best of ``repeat``)."""
+    import tempfile
+
+    from pinn_vs_nn import A_train, create_network, k, t_physics, t_train, train_pinn
+
+    def timed(telemetry):
+        torch.manual_seed(0)
+        model = create_network()
+        start = time.perf_counter()
+        train_pinn(model, t_train, A_train, t_physics, k, epochs=epochs, log_every=0, telemetry=telemetry)
+        return (time.perf_counter() - start) / epochs
+
+    timed(None)  # warm-up
+    results = {"off": float("inf"), **{f"stride={stride}": float("inf") for stride in strides}}
+    with tempfile.TemporaryDirectory() as tmp:
+        # Interleaved, so drift in machine speed affects every configuration alike
+        for _ in range(repeat):
+            results["off"] = min(results["off"], timed(None))
+            for stride in strides:
+                with Telemetry(os.path.join(tmp, f"overhead-{stride}.jsonl"), stride=stride) as telemetry:
+                    results[f"stride={stride}"] = min(results[f"stride={stride}"], timed(telemetry))
+    return results
+
+
+if __name__ == "__main__":
+    results = measure_overhead()
+    base = results["off"]
+    for label, per_step in results.items():
+        print(f"{label:>10}: {per_step * 1e3:.3f} ms/step ({per_step / base - 1:+.1%})")
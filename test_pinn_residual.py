@@ -0,0 +1,53 @@
+"""The residual engines must give the same physics loss and parameter gradients.
+
+Run with:
+    python -m pytest -q
+"""
+import pytest
+import torch
+import torch.nn as nn
+
+from pinn_ensemble import EnsembleMLP, ensemble_physics_residual
+from pinn_residual import ENGINES, physics_loss
+
+K = 0.5
+
+
+def make_network(seed, width=20):
+    torch.manual_seed(seed)
+    return nn.Sequential(nn.Linear(1, width), nn.Tanh(), nn.Linear(width, width), nn.Tanh(),
+                         nn.Linear(width, width), nn.Tanh(), nn.Linear(width, 1))
+
+
+def loss_and_gradients(model, loss_fn):
+    model.zero_grad()
+    loss = loss_fn(model)
+    loss.backward()
+    return loss.detach(), torch.cat([p.grad.flatten() for p in model.parameters()])
+
+
+@pytest.mark.parametrize("engine", sorted(set(ENGINES) - {"reverse"}))
+@pytest.mark.parametrize("n_points", [1, 100, 1000])
+def test_engine_matches_reverse(engine, n_points):
+    model = make_network(seed=n_points)
+    t_physics = torch.linspace(0.0, 10.0, n_points).view(-1, 1)
+    ref_loss, ref_grads = loss_and_gradients(model, lambda m: physics_loss(m, t_physics, K, engine="reverse"))
+    loss, grads = loss_and_gradients(model, lambda m: physics_loss(m, t_physics, K, engine=engine))
+    torch.testing.assert_close(loss, ref_loss, rtol=1e-5, atol=1e-6)
+    torch.testing.assert_close(grads, ref_grads, rtol=1e-4, atol=1e-6)
+
+
+def test_default_engine_is_reverse():
+    model = make_network(seed=0)
+    t_physics = torch.linspace(0.0, 10.0, 100).view(-1, 1)
+    torch.testing.assert_close(physics_loss(model, t_physics, K),
+                               physics_loss(model, t_physics, K, engine="reverse"))
+
+
+def test_ensemble_engines_match():
+    model = EnsembleMLP([make_network(seed) for seed in range(3)])
+    t_physics = torch.linspace(0.0, 10.0, 100).view(-1, 1)
+    results = {engine: loss_and_gradients(model, lambda m: (ensemble_physics_residual(m, t_physics, K, engine) ** 2).mean())
+               for engine in ("tangent", "reverse")}
+    torch.testing.assert_close(results["tangent"][0], results["reverse"][0], rtol=1e-5, atol=1e-6)
+    torch.testing.assert_close(results["tangent"][1], results["reverse"][1], rtol=1e-4, atol=1e-6)
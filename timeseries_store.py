@@ -0,0 +1,267 @@
+"""Memory-mapped time-series store for tag trend charts.
+
+Every tag is a directory with two column files:
+
+* ``timestamps.npy``: sorted ``datetime64[ns]``, the time index
+* ``values.npy``: ``float32`` samples
+
+Both are opened with ``np.load(mmap_mode="r")``. A range query binary-searches
+the timestamp column (``np.searchsorted`` touches about log2(n) pages) and
+returns views, so nothing outside the range is read. Before a range reaches
+the browser it is downsampled to about one point per horizontal pixel:
+
+* ``minmax``: the minimum and maximum of each bucket. One vectorised pass,
+  chunked so memory stays bounded on a year of 1-second data.
+* ``lttb``: Largest-Triangle-Three-Buckets (Steinarsson, 2013), which keeps
+  the visually important points. It loads the whole range as float64, so
+  it is only suitable for short ranges.
+* ``minmax_lttb`` (default): min-max preselection to a few points per pixel,
+  then LTTB on those (Van Der Donckt et al., 2023). It looks like LTTB at
+  close to the cost of min-max.
+
+Usage:
+    python timeseries_store.py --bench-days 365
+"""
+import argparse
+import os
+import re
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+TIMESERIES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "knowledge", "timeseries")
+CHUNK_POINTS = 1 << 22  # points processed per block when scanning or writing a column
+METHODS = ("minmax_lttb", "minmax", "lttb")
+
+
+# --- 1. Downsampling ---
+def minmax_indices(values, n_buckets, chunk_points=CHUNK_POINTS):
+    """Sorted indices of the min and max of ``n_buckets`` equal-count buckets (plus the end points).
+
+    ``values`` may be a memmap; it is scanned ``chunk_points`` at a time.
+    """
+    n = len(values)
+    if n <= 2 * n_buckets:
+        return np.arange(n)
+    size = -(-n // n_buckets)
+    per_chunk = max(1, chunk_points // size) * size
+    parts = [np.array([0, n - 1])]
+    for start in range(0, n, per_chunk):
+        block = np.asarray(values[start:start + per_chunk])
+        full = len(block) // size
+        if full:
+            buckets = block[:full * size].reshape(full, size)
+            offsets = start + np.arange(full) * size
+            parts += [offsets + buckets.argmin(axis=1), offsets + buckets.argmax(axis=1)]
+        if len(block) > full * size:
+            tail = block[full * size:]
+            offset = start + full * size
+            parts.append(np.array([offset + tail.argmin(), offset + tail.argmax()]))
+    return np.unique(np.concatenate(parts))
+
+
+def lttb_indices(x, y, n_out):
+    """Indices of the ``n_out`` points LTTB keeps (the first and last always included)."""
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # n_out - 2 buckets between the first and the last point
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    # Third vertex for bucket i: the average of bucket i + 1 (the last point for the last bucket)
+    bounds = np.append(edges, n)
+    counts = np.diff(bounds)[1:]
+    cx = np.add.reduceat(x, bounds[1:-1]) / counts
+    cy = np.add.reduceat(y, bounds[1:-1]) / counts
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        xb, yb = x[lo:hi], y[lo:hi]
+        area = np.abs((x[a] - cx[i]) * (yb - y[a]) - (x[a] - xb) * (cy[i] - y[a]))
+        a = lo + int(area.argmax())
+        selected[i + 1] = a
+    return selected
+
+
+def _seconds(timestamps):
+    timestamps = np.asarray(timestamps)
+    return (timestamps - timestamps[0]).astype("timedelta64[ns]").astype(np.float64) * 1e-9
+
+
+def downsample(timestamps, values, n_out, method="minmax_lttb", ratio=4):
+    """Reduce ``(timestamps, values)`` to about ``n_out`` points; returns in-memory arrays."""
+    if method not in METHODS:
+        raise ValueError(f"Unknown method: {method!r}")
+    if len(values) <= n_out:
+        return np.asarray(timestamps), np.asarray(values)
+    if method == "lttb":
+        index = lttb_indices(_seconds(timestamps), values, n_out)
+        return np.asarray(timestamps[index]), np.asarray(values[index])
+    index = minmax_indices(values, n_out // 2 if method == "minmax" else n_out * ratio // 2)
+    # Fancy indexing a memmap reads only the pages holding the selected samples
+    t, v = np.asarray(timestamps[index]), np.asarray(values[index])
+    if method == "minmax":
+        return t, v
+    keep = lttb_indices(_seconds(t), v, n_out)
+    return t[keep], v[keep]
+
+
+# --- 2. Column Store ---
+def _to_datetime64(value):
+    return None if value is None else np.datetime64(value, "ns")
+
+
+class TimeSeriesStore:
+    def __init__(self, root=TIMESERIES_DIR):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _dir(self, tag):
+        return os.path.join(self.root, re.sub(r"[^\w.-]", "_", tag))
+
+    def tags(self):
+        return sorted(name for name in os.listdir(self.root)
+                      if not name.startswith(".") and os.path.isdir(os.path.join(self.root, name)))
+
+    def __contains__(self, tag):
+        return os.path.exists(os.path.join(self._dir(tag), "values.npy"))
+
+    def write_chunks(self, tag, n_points, chunks):
+        """Write a series of ``n_points`` from an iterable of ``(timestamps, values)`` chunks.
+
+        Columns are filled through ``open_memmap``, so a series larger than memory
+        can be written. The tag directory is replaced atomically.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        tmp = tempfile.mkdtemp(prefix=".write-", dir=self.root)
+        try:
+            t_col = np.lib.format.open_memmap(os.path.join(tmp, "timestamps.npy"), mode="w+",
+                                              dtype="datetime64[ns]", shape=(n_points,))
+            v_col = np.lib.format.open_memmap(os.path.join(tmp, "values.npy"), mode="w+",
+                                              dtype=np.float32, shape=(n_points,))
+            filled, last = 0, None
+            for t, v in chunks:
+                t = np.asarray(t, dtype="datetime64[ns]")
+                if len(t) != len(v):
+                    raise ValueError("timestamps and values must have the same length")
+                if len(t) and ((last is not None and t[0] < last) or np.any(t[1:] < t[:-1])):
+                    raise ValueError(f"timestamps for {tag!r} must be sorted")
+                t_col[filled:filled + len(t)] = t
+                v_col[filled:filled + len(t)] = v
+                filled += len(t)
+                last = t[-1] if len(t) else last
+            if filled != n_points:
+                raise ValueError(f"expected {n_points} points for {tag!r}, got {filled}")
+            t_col.flush()
+            v_col.flush()
+            del t_col, v_col
+            entry = self._dir(tag)
+            if os.path.isdir(entry):
+                shutil.rmtree(entry)
+            os.replace(tmp, entry)
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+
+    def write(self, tag, timestamps, values):
+        self.write_chunks(tag, len(values), [(timestamps, values)])
+
+    def columns(self, tag):
+        """``(timestamps, values)`` as read-only memmaps; raises KeyError for an unknown tag."""
+        entry = self._dir(tag)
+        try:
+            return (np.load(os.path.join(entry, "timestamps.npy"), mmap_mode="r"),
+                    np.load(os.path.join(entry, "values.npy"), mmap_mode="r"))
+        except FileNotFoundError:
+            raise KeyError(tag) from None
+
+    def range(self, tag, start=None, end=None):
+        """Memmap views of the samples with ``start <= t < end`` (either bound may be None)."""
+        timestamps, values = self.columns(tag)
+        lo = 0 if start is None else int(np.searchsorted(timestamps, _to_datetime64(start), side="left"))
+        hi = len(timestamps) if end is None else int(np.searchsorted(timestamps, _to_datetime64(end), side="left"))
+        return timestamps[lo:hi], values[lo:hi]
+
+    def query(self, tag, start=None, end=None, n_out=1000, method="minmax_lttb"):
+        """Downsampled samples of ``tag`` in ``[start, end)``: ``{"timestamps", "values", "n_raw"}``."""
+        timestamps, values = self.range(tag, start, end)
+        t, v = downsample(timestamps, values, n_out, method=method)
+        return {"timestamps": t, "values": v, "n_raw": len(values)}
+
+    def latest(self, tag):
+        """``(timestamp, value)`` of the newest sample, or None for an empty series."""
+        timestamps, values = self.columns(tag)
+        return (timestamps[-1], float(values[-1])) if len(values) else None
+
+    def span(self, tag):
+        timestamps, _ = self.columns(tag)
+        return (timestamps[0], timestamps[-1]) if len(timestamps) else None
+
+
+# --- 3. Synthetic PI-like Data ---
+def synthetic_chunks(n_points, end, period_s=1, level=0.0, scale=1.0, seed=0, chunk_points=CHUNK_POINTS):
+    """Chunks of a daily cycle plus drift, noise and rare spikes, sampled every ``period_s`` seconds up to ``end``."""
+    rng = np.random.default_rng(seed)
+    step = np.timedelta64(int(period_s * 1e9), "ns")
+    first = np.datetime64(end, "ns") - step * (n_points - 1)
+    for start in range(0, n_points, chunk_points):
+        index = np.arange(start, min(start + chunk_points, n_points))
+        seconds = index * float(period_s)
+        values = (level + scale * (0.5 * np.sin(2 * np.pi * seconds / 86400)
+                                   + 0.2 * np.sin(2 * np.pi * seconds / (86400 * 29.5))
+                                   + 0.05 * rng.standard_normal(len(index))))
+        spikes = rng.random(len(index)) < 2e-6
+        values[spikes] += scale * rng.choice([-2.0, 2.0], size=int(spikes.sum()))
+        yield first + step * index, values.astype(np.float32)
+
+
+def write_synthetic(store, tag, days, period_s=1, end=None, **kwargs):
+    n_points = int(days * 86400 / period_s)
+    end = end if end is not None else np.datetime64("today", "D")
+    store.write_chunks(tag, n_points, synthetic_chunks(n_points, end, period_s, **kwargs))
+    return n_points
+
+
+def benchmark(days=365, n_out=1000, root=None):
+    """Write ``days`` of 1-second data for one tag and time range queries against it."""
+    root = root or tempfile.mkdtemp(prefix="timeseries-bench-")
+    store = TimeSeriesStore(root)
+    try:
+        start = time.perf_counter()
+        n = write_synthetic(store, "PI-BENCH-TEMP-PV", days, level=80.0, scale=5.0)
+        print(f"Wrote {n:,} points ({n * 12 / 2**20:,.0f} MiB) in {time.perf_counter() - start:.1f}s")
+        first, last = store.span("PI-BENCH-TEMP-PV")
+        windows = {"full range": (None, None), "last 30 days": (last - np.timedelta64(30, "D"), None),
+                   "last day": (last - np.timedelta64(1, "D"), None), "last hour": (last - np.timedelta64(1, "h"), None)}
+        for label, (lo, hi) in windows.items():
+            for method in METHODS:
+                start = time.perf_counter()
+                result = store.query("PI-BENCH-TEMP-PV", lo, hi, n_out=n_out, method=method)
+                elapsed = time.perf_counter() - start
+                # Allocations are measured on a second run; tracemalloc slows the first one down
+                tracemalloc.start()
+                store.query("PI-BENCH-TEMP-PV", lo, hi, n_out=n_out, method=method)
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                print(f"{label:>13} {method:>11}: {result['n_raw']:>11,} -> {len(result['values']):>5} points "
+                      f"in {elapsed * 1000:7.1f} ms, peak heap {peak / 2**20:6.1f} MiB")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--bench-days", type=float, default=365, help="Days of 1-second data to benchmark on")
+    parser.add_argument("--width", type=int, default=1000, help="Chart width in pixels (points returned)")
+    args = parser.parse_args(argv)
+    benchmark(args.bench_days, args.width)
+
+
+if __name__ == "__main__":
+    main()